@@ -6,6 +6,14 @@ import os
 # --- File Paths ---
 # JMdict_e XML file (should be placed in rtkr/resources/)
 JMDICT_COMMON_FILE = os.path.join('resources', 'JMdict_e')
+# Compressed JMdict files are also accepted and decompressed while streaming.
+# The format is detected from the file's magic bytes, the extension is only used to find the file.
+# zstd input requires the optional 'zstandard' package.
+JMDICT_COMPRESSED_FILES = [
+    os.path.join('resources', 'JMdict_e.gz'),
+    os.path.join('resources', 'JMdict_e.xz'),
+    os.path.join('resources', 'JMdict_e.zst'),
+]
 
 # JLPT specific configurations
 JLPT_LEVELS = [1, 2, 3, 4, 5]
@@ -23,22 +31,75 @@ LOCAL_JLPT_FILES = {
     5: os.path.join('resources', 'n5.csv'),
 }
 
+# User-supplied word lists shown in the source panel next to JMdict and the JLPT levels.
+# Each entry is a dict with 'name' (unique id), 'path' (CSV, TSV or Anki text file, relative
+# to the rtkr package or absolute), and optionally 'label' (button text) and 'sample_size'
+# (keep only a random sample of that many words, for very large lists). Example:
+# USER_SOURCES = [{'name': 'glossary', 'label': 'Book Glossary', 'path': os.path.join('resources', 'glossary.csv')}]
+# Packages can also register sources through the 'rtkr.sources' entry point group (see sources.py).
+USER_SOURCES = []
+
 # Font file (should be placed in rtkr/resources/fonts/)
 FONT_URL = "https://github.com/google/fonts/raw/master/ofl/hinamincho/HinaMincho-Regular.ttf"
 FONT_FILE = os.path.join(os.path.dirname(__file__), 'resources', 'fonts', 'HinaMincho-Regular.ttf') # Updated path
+# Cached font subsets covering the characters of a word source (built with the optional 'fonttools' package).
+# Generated files, so they live in the 'data' directory with the other caches rather than in resources/
+FONT_SUBSET_DIR = os.path.join(os.path.dirname(__file__), 'data', 'font_subsets')
+FONT_SUBSET_CACHE_LIMIT = 8 # Maximum number of subset files kept, least recently used ones are deleted
 
 # Revisions file (will be stored in the 'data' directory outside the package)
 # This path is relative to the directory where the app is run from (e.g., rtkr/)
 REVISIONS_FILE = os.path.join(os.path.dirname(__file__), 'data', 'revisions.json') # Updated path
+# Persisted JMdict parse keyed by <ent_seq> (sqlite database), used to skip or limit re-parsing when the file changes
+JMDICT_CACHE_FILE = os.path.join(os.path.dirname(__file__), 'data', 'jmdict_cache.sqlite3')
+# Bloom filters of recently shown words, so new sessions don't repeat them
+SEEN_FILTER_FILE = os.path.join(os.path.dirname(__file__), 'data', 'seen_words.bin')
+# Seen words of the drill server (python -m rtkr.server); its revisions go to REVISIONS_FILE like the app's
+SERVER_SEEN_FILTER_FILE = os.path.join(os.path.dirname(__file__), 'data', 'server_seen_words.bin')
+# Default file offered for bulk import/export of revisions (CSV, TSV or Anki text)
+REVISIONS_EXPORT_FILE = os.path.join(os.path.dirname(__file__), 'data', 'revisions_export.txt')
 
 # Kivy Language (KV) file
 KV_FILE = 'rtkr.kv' # Name of the KV file, assumed to be in the same directory as main.py
 
 # --- Application Settings ---
 BUFFER_SIZE = 5  # Number of words to pre-fetch
+LOAD_CANCEL_CHECK_INTERVAL = 2000 # Entries parsed between checks for a newer source selection
 FONT_SIZE_LIST = 24 # Font size for items in the revision list
 # These should be raw numbers, not dp() calls. dp() will be applied in main.py.
 RESIZE_HANDLE_WIDTH_RAW = 5 # Width of the draggable handle in density-independent pixels
 MIN_PANEL_WIDTH_RAW = 250 # Minimum width for the revision panel
 MAX_PANEL_WIDTH_RATIO = 0.8 # Maximum width as a ratio of window width
 BLUE_DOT_DISPLAY_DURATION = 0.35 # Duration in seconds the blue dot is visible
+PRERENDER_WORD_TEXTURES = True # Render buffered words ahead of time so reveal/next only swap textures
+TEXTURE_CACHE_SIZE = 4 * BUFFER_SIZE # Maximum number of pre-rendered textures kept (two per word)
+PRERENDER_TIMING = False # Time each word label texture update (cached or rendered) and print it, to compare with PRERENDER_WORD_TEXTURES off
+# Recently shown words are skipped when picking new ones (see seen_filter.py).
+# Memory is about 1.2 bytes per word of capacity per filter at 1%, ~280 KB in total with the defaults.
+SEEN_FILTER_CAPACITY = 100000 # Words remembered per filter before it is rotated out
+SEEN_FILTER_FP_RATE = 0.01 # Chance of skipping a word that wasn't actually shown recently
+SEEN_FILTER_ROTATE_DAYS = 7 # Days before the current filter is rotated; words are remembered 7 to 14 days
+SEEN_FILTER_MAX_RETRIES = 8 # Random picks tried before accepting a recently shown word (0 disables skipping)
+SEEN_FILTER_SAVE_EVERY = 20 # Shown words between saves of the filter (also saved on exit)
+SEARCH_MAX_RESULTS = 10 # Number of matches shown under the search box
+UI_STATS_INTERVAL = 0 # Seconds between UI wakeup rate reports printed to the console (0 disables them)
+UI_BATCH_UPDATES = True # Apply UI updates in one batch per frame; False restores the old per-update callbacks and polling (for comparison)
+
+# --- Network Settings ---
+FETCH_TIMEOUT = 10 # Seconds before a connection or read times out
+FETCH_MAX_CONCURRENT = 4 # Maximum number of requests in flight at once
+FETCH_POOL_SIZE_PER_HOST = 4 # Maximum number of idle keep-alive connections kept per host
+FETCH_MAX_RETRIES = 3 # Retries after a failed request (network error, 429 or 5xx)
+FETCH_BACKOFF_BASE = 0.5 # Seconds, doubled on each retry and randomized (jitter)
+PREFETCH_ALL_JLPT_LEVELS = True # Download all JLPT lists in the background once one is selected
+
+# --- Streaming Settings ---
+STREAM_CHUNK_SIZE = 1024 * 1024 # Bytes read (and decompressed) per chunk by the reader thread
+STREAM_QUEUE_DEPTH = 8 # Maximum number of decoded chunks waiting to be parsed
+
+# --- Drill Server Settings (python -m rtkr.server) ---
+SERVER_HOST = '127.0.0.1' # Only local clients by default
+SERVER_PORT = 8765
+SERVER_MAX_SESSIONS = 1000 # Least recently used sessions beyond this are dropped
+SERVER_AUDIO_CACHE_SIZE = 256 # Number of generated TTS clips kept in memory
+SERVER_SAVE_DELAY = 2.0 # Seconds after a change before revisions and seen words are saved (batches writes)
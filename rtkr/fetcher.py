@@ -0,0 +1,265 @@
+# rtkr/fetcher.py
+
+import http.client
+import os
+import random
+import threading
+import time
+import urllib.parse
+from concurrent.futures import ThreadPoolExecutor
+
+# Import configuration settings
+from .config import (
+    FETCH_TIMEOUT, FETCH_MAX_CONCURRENT, FETCH_POOL_SIZE_PER_HOST,
+    FETCH_MAX_RETRIES, FETCH_BACKOFF_BASE
+)
+
+# Status codes worth retrying (rate limiting and temporary server errors)
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+REDIRECT_STATUSES = {301, 302, 303, 307, 308}
+MAX_REDIRECTS = 5
+READ_CHUNK_SIZE = 64 * 1024 # Bytes written to disk at a time when streaming a download
+
+class FetchError(Exception):
+    """
+    Raised when a request fails with a status that should not (or can no longer) be retried.
+    """
+    def __init__(self, url, status, reason):
+        super().__init__(f"HTTP Error {status}: {reason}")
+        self.url = url
+        self.status = status
+        self.reason = reason
+
+class HTTPFetcher:
+    """
+    Small HTTP client shared by the app for all downloads (JLPT lists, font).
+    Keeps idle keep-alive connections per host for reuse, limits the number of
+    requests in flight, retries failed requests with jittered exponential backoff,
+    and can stream responses straight to disk.
+    """
+
+    def __init__(self, max_concurrent=FETCH_MAX_CONCURRENT, pool_size_per_host=FETCH_POOL_SIZE_PER_HOST,
+                 max_retries=FETCH_MAX_RETRIES, backoff_base=FETCH_BACKOFF_BASE, timeout=FETCH_TIMEOUT):
+        self.max_concurrent = max_concurrent
+        self.pool_size_per_host = pool_size_per_host
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.timeout = timeout
+        self._slots = threading.BoundedSemaphore(max_concurrent) # Caps concurrent requests
+        self._pool_lock = threading.Lock()
+        self._idle = {} # (scheme, host, port) -> list of idle connections
+
+    # --- Connection pool ---
+
+    def _get_connection(self, scheme, host, port):
+        """
+        Returns an idle connection to the host if one is available, otherwise a new one.
+        """
+        with self._pool_lock:
+            idle = self._idle.get((scheme, host, port))
+            if idle:
+                return idle.pop()
+        if scheme == 'https':
+            return http.client.HTTPSConnection(host, port, timeout=self.timeout)
+        return http.client.HTTPConnection(host, port, timeout=self.timeout)
+
+    def _release_connection(self, key, conn, response):
+        """
+        Puts a connection back in the pool if the server allows reusing it, otherwise closes it.
+        The response must have been read completely.
+        """
+        if response.will_close:
+            conn.close()
+            return
+        with self._pool_lock:
+            idle = self._idle.setdefault(key, [])
+            if len(idle) < self.pool_size_per_host:
+                idle.append(conn)
+                return
+        conn.close()
+
+    def close(self):
+        """
+        Closes all idle connections.
+        """
+        with self._pool_lock:
+            pools, self._idle = self._idle, {}
+        for idle in pools.values():
+            for conn in idle:
+                conn.close()
+
+    # --- Requests ---
+
+    def _request(self, url, handle_body):
+        """
+        Performs a GET request, following redirects and retrying failures.
+        handle_body(response) is called with a successful response and must read it completely;
+        its return value is returned. Raises FetchError or the last network error on failure.
+        """
+        attempt = 0
+        while True:
+            try:
+                with self._slots:
+                    return self._request_once(url, handle_body)
+            except FetchError as e:
+                if e.status not in RETRY_STATUSES or attempt >= self.max_retries:
+                    raise
+                error = e
+            except (OSError, http.client.HTTPException) as e:
+                if attempt >= self.max_retries:
+                    raise
+                error = e
+            # Full jitter: sleep a random time up to the exponential backoff for this attempt
+            delay = random.uniform(0, self.backoff_base * (2 ** attempt))
+            attempt += 1
+            print(f"Request to {url} failed ({error}). Retry {attempt}/{self.max_retries} in {delay:.2f}s...")
+            time.sleep(delay)
+
+    def _request_once(self, url, handle_body):
+        """
+        Performs a single GET request attempt, following redirects.
+        """
+        for _ in range(MAX_REDIRECTS + 1):
+            parts = urllib.parse.urlsplit(url)
+            scheme = parts.scheme or 'http'
+            port = parts.port or (443 if scheme == 'https' else 80)
+            key = (scheme, parts.hostname, port)
+            path = parts.path or '/'
+            if parts.query:
+                path += '?' + parts.query
+
+            conn = self._get_connection(*key)
+            try:
+                conn.request('GET', path, headers={'Connection': 'keep-alive', 'User-Agent': 'rtkr'})
+                response = conn.getresponse()
+                if response.status in REDIRECT_STATUSES and response.getheader('Location'):
+                    response.read() # Drain the body so the connection can be reused
+                    self._release_connection(key, conn, response)
+                    url = urllib.parse.urljoin(url, response.getheader('Location'))
+                    continue
+                if response.status != 200:
+                    response.read()
+                    self._release_connection(key, conn, response)
+                    raise FetchError(url, response.status, response.reason)
+                result = handle_body(response)
+                self._release_connection(key, conn, response)
+                return result
+            except (OSError, http.client.HTTPException):
+                conn.close() # Never reuse a connection in an unknown state
+                raise
+        raise FetchError(url, 310, "Too many redirects")
+
+    def fetch_bytes(self, url):
+        """
+        Downloads a URL and returns its content as bytes.
+        """
+        return self._request(url, lambda response: response.read())
+
+    def fetch_text(self, url, encoding='utf-8'):
+        """
+        Downloads a URL and returns its content decoded as text.
+        """
+        return self.fetch_bytes(url).decode(encoding)
+
+    def download_to_file(self, url, path):
+        """
+        Streams a URL straight to a file. The data is written to a temporary '.part'
+        file first and moved into place only once the download is complete.
+        """
+        part_path = path + '.part'
+
+        def write_body(response):
+            with open(part_path, 'wb') as f:
+                while True:
+                    data = response.read(READ_CHUNK_SIZE)
+                    if not data:
+                        break
+                    f.write(data)
+
+        try:
+            self._request(url, write_body)
+            os.replace(part_path, path)
+        finally:
+            if os.path.exists(part_path):
+                os.remove(part_path)
+
+    def fetch_many(self, urls, encoding='utf-8'):
+        """
+        Downloads several URLs concurrently (up to max_concurrent at a time) and returns
+        a dict of url -> text. Failed downloads map to None.
+        """
+        def fetch_or_none(url):
+            try:
+                return self.fetch_text(url, encoding)
+            except Exception as e:
+                print(f"Error downloading from {url}: {e}")
+                return None
+
+        with ThreadPoolExecutor(max_workers=self.max_concurrent) as executor:
+            return dict(zip(urls, executor.map(fetch_or_none, urls)))
+
+# Shared fetcher instance, created on first use
+_shared_fetcher = None
+_shared_fetcher_lock = threading.Lock()
+
+def get_fetcher():
+    """
+    Returns the fetcher shared by the whole app.
+    """
+    global _shared_fetcher
+    with _shared_fetcher_lock:
+        if _shared_fetcher is None:
+            _shared_fetcher = HTTPFetcher()
+        return _shared_fetcher
+
+def _run_benchmark(latency=0.2):
+    """
+    Compares downloading the JLPT lists one at a time with fresh urllib connections
+    (the old path) against the pooled concurrent fetcher, using a local HTTP server
+    stand-in that serves the bundled CSV files with an artificial per-request latency.
+    """
+    import functools
+    import http.server
+    import urllib.request
+
+    resources_dir = os.path.join(os.path.dirname(__file__), 'resources')
+
+    class SlowHandler(http.server.SimpleHTTPRequestHandler):
+        protocol_version = 'HTTP/1.1' # Enables keep-alive
+
+        def do_GET(self):
+            time.sleep(latency) # Simulate network round trip time
+            super().do_GET()
+
+        def log_message(self, format, *args):
+            pass
+
+    handler = functools.partial(SlowHandler, directory=resources_dir)
+    server = http.server.ThreadingHTTPServer(('127.0.0.1', 0), handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    urls = [f"http://127.0.0.1:{server.server_address[1]}/n{level}.csv" for level in range(1, 6)]
+
+    try:
+        start = time.perf_counter()
+        serial = {}
+        for url in urls:
+            with urllib.request.urlopen(url, timeout=FETCH_TIMEOUT) as response:
+                serial[url] = response.read().decode('utf-8')
+        serial_time = time.perf_counter() - start
+
+        fetcher = HTTPFetcher()
+        start = time.perf_counter()
+        pooled = fetcher.fetch_many(urls)
+        pooled_time = time.perf_counter() - start
+        fetcher.close()
+    finally:
+        server.shutdown()
+        server.server_close()
+
+    assert pooled == serial, "Pooled and serial downloads returned different content"
+    print(f"Serial urllib: {serial_time:.3f}s, pooled concurrent: {pooled_time:.3f}s "
+          f"({len(urls)} files, {latency * 1000:.0f} ms simulated latency)")
+
+if __name__ == '__main__':
+    # Run with: python -m rtkr.fetcher
+    _run_benchmark()
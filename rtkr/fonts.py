@@ -0,0 +1,186 @@
+# rtkr/fonts.py
+
+import hashlib
+import json
+import os
+import time
+
+# fontTools is optional, without it the full font is always used
+try:
+    from fontTools import subset as font_subset
+except ImportError:
+    font_subset = None
+
+# Import configuration settings
+from .config import FONT_FILE, FONT_SUBSET_DIR, FONT_SUBSET_CACHE_LIMIT
+
+# Name the full font is registered under with Kivy's LabelBase
+FULL_FONT_NAME = 'HinaMincho'
+
+# Characters always included in a subset: ASCII, CJK punctuation, Hiragana, Katakana
+# and full-width forms, so UI messages and kana-only words never need the full font
+BASE_SUBSET_CHARS = frozenset(
+    [chr(c) for c in range(0x20, 0x7F)] +
+    [chr(c) for c in range(0x3000, 0x3040)] +
+    [chr(c) for c in range(0x3040, 0x30A0)] +
+    [chr(c) for c in range(0x30A0, 0x3100)] +
+    [chr(c) for c in range(0xFF00, 0xFFF0)] +
+    ['…']
+)
+
+# Last subset built for each word source, so the next start can use it before the words are loaded
+SUBSET_INDEX_FILE = os.path.join(FONT_SUBSET_DIR, 'index.json')
+
+# Currently active subset: (registered font name, characters it covers)
+_active_subset = None
+
+# Called once, the first time a text needs the full font (registers it with Kivy lazily)
+_full_font_loader = None
+
+def collect_subset_chars(words):
+    """
+    Returns the set of characters needed to display the readings and kanji of the given
+    words (in the {'japanese': [{'reading': ..., 'word': ...}]} format), plus the base characters.
+    """
+    chars = set(BASE_SUBSET_CHARS)
+    for item in words:
+        jap_entry = item.get('japanese', [{}])[0]
+        chars.update(jap_entry.get('reading', ''))
+        chars.update(jap_entry.get('word', ''))
+    return frozenset(chars)
+
+def subset_key(chars):
+    """
+    Returns a short key identifying a character set, used to name the cached subset file.
+    """
+    return hashlib.sha1(''.join(sorted(chars)).encode('utf-8')).hexdigest()[:16]
+
+def build_font_subset(chars):
+    """
+    Returns the path of a subset of FONT_FILE covering the given characters, building it
+    if it isn't cached yet. Returns None if fontTools is not installed or subsetting fails.
+    """
+    if font_subset is None:
+        print("fontTools is not installed, using the full font.")
+        return None
+    if not os.path.exists(FONT_FILE):
+        return None
+
+    path = os.path.join(FONT_SUBSET_DIR, f"{os.path.splitext(os.path.basename(FONT_FILE))[0]}-{subset_key(chars)}.ttf")
+    if os.path.exists(path):
+        os.utime(path) # Mark as recently used for the cache cleanup
+        print(f"Using cached font subset {path}.")
+        return path
+
+    try:
+        start = time.perf_counter()
+        if not os.path.exists(FONT_SUBSET_DIR):
+            os.makedirs(FONT_SUBSET_DIR)
+        options = font_subset.Options()
+        options.name_IDs = ['*'] # Keep the font names
+        options.notdef_outline = True
+        font = font_subset.load_font(FONT_FILE, options)
+        subsetter = font_subset.Subsetter(options)
+        subsetter.populate(unicodes=[ord(c) for c in chars])
+        subsetter.subset(font)
+        # Write to a temporary file first, so a partial file is never picked up from the cache
+        part_path = path + '.part'
+        font_subset.save_font(font, part_path, options)
+        font.close()
+        os.replace(part_path, path)
+        print(f"Built font subset with {len(chars)} characters in {time.perf_counter() - start:.2f}s "
+              f"({os.path.getsize(path) / 1024:.0f} KB, full font {os.path.getsize(FONT_FILE) / 1024:.0f} KB).")
+    except Exception as e:
+        print(f"Error building font subset: {e}. Using the full font.")
+        return None
+
+    _prune_subset_cache()
+    return path
+
+def _prune_subset_cache():
+    """
+    Deletes the least recently used subset files beyond FONT_SUBSET_CACHE_LIMIT.
+    """
+    try:
+        files = [os.path.join(FONT_SUBSET_DIR, name) for name in os.listdir(FONT_SUBSET_DIR) if name.endswith('.ttf')]
+        files.sort(key=os.path.getmtime, reverse=True)
+        for old_file in files[FONT_SUBSET_CACHE_LIMIT:]:
+            os.remove(old_file)
+    except OSError as e:
+        print(f"Error cleaning up font subsets: {e}")
+
+def remember_subset(source_name, path, chars):
+    """
+    Records the subset built for a word source in SUBSET_INDEX_FILE.
+    """
+    index = _read_subset_index()
+    index[source_name] = {'file': os.path.basename(path), 'chars': ''.join(sorted(chars))}
+    try:
+        part_path = SUBSET_INDEX_FILE + '.part'
+        with open(part_path, 'w', encoding='utf-8') as f:
+            json.dump(index, f, ensure_ascii=False)
+        os.replace(part_path, SUBSET_INDEX_FILE)
+    except OSError as e:
+        print(f"Error saving font subset index: {e}")
+
+def cached_subset(source_name):
+    """
+    Returns (path, chars) of the last subset built for a word source, or None if there is
+    none or its file was cleaned up.
+    """
+    entry = _read_subset_index().get(source_name)
+    if not entry:
+        return None
+    path = os.path.join(FONT_SUBSET_DIR, entry.get('file', ''))
+    if not os.path.isfile(path):
+        return None
+    return path, frozenset(entry.get('chars', ''))
+
+def _read_subset_index():
+    if not os.path.exists(SUBSET_INDEX_FILE):
+        return {}
+    try:
+        with open(SUBSET_INDEX_FILE, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError) as e:
+        print(f"Error reading font subset index: {e}")
+        return {}
+
+def set_full_font_loader(loader):
+    """
+    Sets the function making FULL_FONT_NAME usable (e.g. registering it with Kivy).
+    It is called the first time font_for_text returns the full font, so the full font is
+    never loaded while the active subset covers every text shown.
+    """
+    global _full_font_loader
+    _full_font_loader = loader
+
+def activate_subset(font_name, chars):
+    """
+    Makes font_for_text use the subset registered as font_name for texts it covers.
+    Pass None to go back to the full font for everything.
+    """
+    global _active_subset
+    _active_subset = (font_name, chars) if font_name else None
+
+def active_subset_chars():
+    """
+    Returns the characters covered by the active subset, or None if the full font is used.
+    """
+    active = _active_subset
+    return active[1] if active is not None else None
+
+def font_for_text(text):
+    """
+    Returns the font name to display a text with: the active subset if it covers
+    every character of the text, otherwise the full font.
+    """
+    global _full_font_loader
+    active = _active_subset
+    if active is not None and active[1].issuperset(text):
+        return active[0]
+    loader, _full_font_loader = _full_font_loader, None
+    if loader is not None:
+        print(f"Loading the full font for '{text}'.")
+        loader()
+    return FULL_FONT_NAME
@@ -0,0 +1,193 @@
+# rtkr/jmdict_store.py
+
+import hashlib
+import json
+import os
+import re
+import sqlite3
+import time
+from contextlib import closing
+
+# Import configuration settings
+from .config import JMDICT_CACHE_FILE, LOAD_CANCEL_CHECK_INTERVAL
+from .utils import iter_text_chunks, iter_split_records
+
+# Version of the cache layout, bump when it changes so old caches are rebuilt
+CACHE_VERSION = 3
+
+KANJI_PATTERN = re.compile(r'<keb>(.*?)</keb>')
+READING_PATTERN = re.compile(r'<reb>(.*?)</reb>')
+SEQ_PATTERN = re.compile(r'<ent_seq>(.*?)</ent_seq>')
+
+# Number of ent_seqs per 'IN (...)' query, below sqlite's limit on query parameters
+SQL_BATCH_SIZE = 500
+
+def parse_entry(entry_text):
+    """
+    Returns the first reading and the first kanji of a raw JMdict entry.
+    """
+    kanji_match = KANJI_PATTERN.search(entry_text)
+    reading_match = READING_PATTERN.search(entry_text)
+    return (
+        reading_match.group(1).strip() if reading_match else '',
+        kanji_match.group(1).strip() if kanji_match else ''
+    )
+
+def entry_digest(entry_text):
+    """
+    Returns a short hash of a raw JMdict entry, used to detect changed entries.
+    Only the text up to </entry> counts: the last record of the file also carries the
+    </JMdict> trailer, which would otherwise make it look changed once entries are appended.
+    """
+    end = entry_text.rfind('</entry>')
+    if end != -1:
+        entry_text = entry_text[:end]
+    return hashlib.blake2b(entry_text.encode('utf-8'), digest_size=8).hexdigest()
+
+class JMdictDiff:
+    """
+    Changes between two versions of JMdict, keyed by <ent_seq>.
+    'added' and 'changed' map ent_seq -> (reading, kanji) of the new version,
+    'removed' maps ent_seq -> (reading, kanji) of the old version for deleted and changed entries.
+    'digests' maps the added and changed ent_seqs to the hash of their new entry text, and
+    'file_info' is the (size, mtime) of the new file; JMdictStore.commit() records both.
+    """
+
+    def __init__(self, file_info=None):
+        self.added = {}
+        self.changed = {}
+        self.removed = {}
+        self.digests = {}
+        self.file_info = file_info
+
+    def __len__(self):
+        return len(self.added) + len(self.changed) + len(self.removed)
+
+    def __str__(self):
+        deleted = len(self.removed) - len(self.changed)
+        return f"{len(self.added)} added, {len(self.changed)} changed, {deleted} deleted"
+
+class JMdictStore:
+    """
+    Persisted parse of JMdict in an sqlite database, keyed by <ent_seq>. For each entry it keeps
+    a hash of the raw entry text and the parsed (reading, kanji).
+
+    When the JMdict file is unchanged (same size and modification time), the words come
+    straight from the database without reading the XML. When it has changed, sync() compares
+    the new file entry by entry with the stored hashes, parses only added or changed entries
+    and returns the diff; commit() then writes just those rows. Nothing is kept in memory
+    between calls, and each call opens its own connection, so any thread can use the store.
+    """
+
+    def __init__(self, cache_path=JMDICT_CACHE_FILE):
+        self.cache_path = cache_path
+
+    def _connect(self):
+        """
+        Opens the database, creating it (or recreating it for another CACHE_VERSION) if needed.
+        """
+        cache_dir = os.path.dirname(self.cache_path)
+        if cache_dir and not os.path.exists(cache_dir):
+            os.makedirs(cache_dir)
+        conn = sqlite3.connect(self.cache_path)
+        try:
+            with conn:
+                conn.execute("CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT)")
+                row = conn.execute("SELECT value FROM meta WHERE key = 'version'").fetchone()
+                if row is None or row[0] != str(CACHE_VERSION):
+                    conn.execute("DROP TABLE IF EXISTS entries")
+                    conn.execute("DELETE FROM meta")
+                    conn.execute("INSERT INTO meta VALUES ('version', ?)", (str(CACHE_VERSION),))
+                conn.execute("CREATE TABLE IF NOT EXISTS entries "
+                             "(seq TEXT PRIMARY KEY, digest TEXT, reading TEXT, kanji TEXT)")
+        except Exception:
+            conn.close()
+            raise
+        return conn
+
+    def _file_info(self, conn):
+        row = conn.execute("SELECT value FROM meta WHERE key = 'file_info'").fetchone()
+        return tuple(json.loads(row[0])) if row else None
+
+    def iter_entries(self):
+        """
+        Yields the stored (ent_seq, reading, kanji) entries, streamed from the database.
+        """
+        with closing(self._connect()) as conn:
+            yield from conn.execute("SELECT seq, reading, kanji FROM entries")
+
+    def sync(self, path, check):
+        """
+        Compares the JMdict file at 'path' with the store and returns the JMdictDiff between
+        them (empty if the file didn't change). The store itself is not changed: pass the diff
+        to commit() once it has been applied. 'check' is called regularly and may raise to cancel.
+        """
+        stat = os.stat(path)
+        file_info = (stat.st_size, stat.st_mtime)
+        with closing(self._connect()) as conn:
+            stored_info = self._file_info(conn)
+            if stored_info is not None and list(stored_info) == list(file_info) and \
+                    conn.execute("SELECT 1 FROM entries LIMIT 1").fetchone():
+                print("JMdict file unchanged, using the cache.")
+                return JMdictDiff()
+
+            start = time.perf_counter()
+            diff = JMdictDiff(file_info)
+            # Only the hashes are read for the comparison; they are dropped when sync returns
+            old_digests = dict(conn.execute("SELECT seq, digest FROM entries"))
+            # Stream the file: a reader thread decompresses and decodes chunks while we split
+            # them into entries here. closing() stops the reader thread right away on cancellation.
+            with closing(iter_text_chunks(path)) as chunks:
+                for count, entry_text in enumerate(iter_split_records(chunks, '<entry>')):
+                    if count % LOAD_CANCEL_CHECK_INTERVAL == 0:
+                        check()
+                    digest = entry_digest(entry_text)
+                    seq_match = SEQ_PATTERN.search(entry_text)
+                    seq = seq_match.group(1).strip() if seq_match else digest # Fall back to the hash as key
+
+                    old_digest = old_digests.pop(seq, None)
+                    if old_digest == digest:
+                        continue # Unchanged, no need to parse it again
+                    reading, kanji = parse_entry(entry_text)
+                    diff.digests[seq] = digest
+                    if old_digest is None:
+                        diff.added[seq] = (reading, kanji)
+                    else:
+                        diff.changed[seq] = (reading, kanji)
+                        diff.removed[seq] = None # Filled with the old version below
+
+            # What is left in old_digests is no longer in the file
+            for seq in old_digests:
+                diff.removed[seq] = None
+            # Look up the old version of the removed and changed entries only
+            removed_seqs = list(diff.removed)
+            for i in range(0, len(removed_seqs), SQL_BATCH_SIZE):
+                check()
+                batch = removed_seqs[i:i + SQL_BATCH_SIZE]
+                query = f"SELECT seq, reading, kanji FROM entries WHERE seq IN ({','.join('?' * len(batch))})"
+                for seq, reading, kanji in conn.execute(query, batch):
+                    diff.removed[seq] = (reading, kanji)
+
+        print(f"Compared JMdict with the cache in {time.perf_counter() - start:.2f}s: {diff}.")
+        return diff
+
+    def commit(self, diff):
+        """
+        Writes a diff returned by sync() to the store, in one transaction. Only the added,
+        changed and removed rows are written, so the cost is proportional to the changes.
+        """
+        if diff.file_info is None:
+            return # Nothing changed
+        start = time.perf_counter()
+        try:
+            with closing(self._connect()) as conn, conn:
+                deleted = [(seq,) for seq in diff.removed if seq not in diff.changed]
+                conn.executemany("DELETE FROM entries WHERE seq = ?", deleted)
+                conn.executemany(
+                    "INSERT OR REPLACE INTO entries VALUES (?, ?, ?, ?)",
+                    ((seq, diff.digests[seq], reading, kanji)
+                     for seq, (reading, kanji) in list(diff.added.items()) + list(diff.changed.items())))
+                conn.execute("INSERT OR REPLACE INTO meta VALUES ('file_info', ?)", (json.dumps(diff.file_info),))
+            print(f"Saved JMdict cache changes ({diff}) in {time.perf_counter() - start:.2f}s.")
+        except Exception as e:
+            print(f"Error saving JMdict cache {self.cache_path}: {e}")
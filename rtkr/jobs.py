@@ -0,0 +1,92 @@
+# rtkr/jobs.py
+
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+class JobCancelled(Exception):
+    """
+    Raised by LoadJob.check() inside a job that was superseded by a newer one.
+    """
+
+class LoadJob:
+    """
+    Handle passed to a running job. Carries the job's generation number and lets the job
+    check cooperatively, between chunks of work, whether it has been superseded.
+    """
+
+    def __init__(self, generation):
+        self.generation = generation
+        self._cancelled = threading.Event()
+
+    def cancel(self):
+        self._cancelled.set()
+
+    @property
+    def cancelled(self):
+        return self._cancelled.is_set()
+
+    def check(self):
+        """
+        Raises JobCancelled if the job has been superseded.
+        """
+        if self._cancelled.is_set():
+            raise JobCancelled(f"Job generation {self.generation} was superseded.")
+
+class GenerationalExecutor:
+    """
+    Runs jobs on a shared worker pool where each new job supersedes the previous one.
+    Submitting a job bumps the generation, cancels the previous job if it hasn't started yet
+    and asks it to stop if it is running. Only results from the latest generation should be
+    published, which is_current() tells.
+    """
+
+    def __init__(self, max_workers=1, name='job'):
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix=name)
+        self._lock = threading.Lock()
+        self._generation = 0
+        self._current = None # (LoadJob, Future) of the latest submitted job
+
+    def submit(self, func, *args):
+        """
+        Schedules func(job, *args) as the new current job and returns its LoadJob.
+        """
+        with self._lock:
+            if self._current is not None:
+                previous_job, previous_future = self._current
+                previous_job.cancel()
+                previous_future.cancel() # Only succeeds if it hasn't started yet
+            self._generation += 1
+            job = LoadJob(self._generation)
+            future = self._executor.submit(self._run, job, func, args)
+            self._current = (job, future)
+            return job
+
+    def submit_task(self, func, *args):
+        """
+        Schedules func(*args) after the jobs already submitted, without superseding the current job.
+        Used for follow-up work of a job that has to run before any later job starts.
+        """
+        return self._executor.submit(self._run_task, func, args)
+
+    def _run_task(self, func, args):
+        try:
+            func(*args)
+        except Exception as e:
+            print(f"Task {getattr(func, '__name__', func)} failed: {e}")
+
+    def is_current(self, job):
+        """
+        Checks if the job is the latest one and hasn't been cancelled.
+        """
+        with self._lock:
+            return job.generation == self._generation and not job.cancelled
+
+    def _run(self, job, func, args):
+        if job.cancelled:
+            return
+        try:
+            func(job, *args)
+        except JobCancelled:
+            print(f"Job generation {job.generation} cancelled.")
+        except Exception as e:
+            print(f"Job generation {job.generation} failed: {e}")
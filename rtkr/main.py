@@ -5,20 +5,20 @@ import json
 import random
 import threading
 import tempfile # Import tempfile for creating temporary files
-import re # Import re for regular expressions (for XML parsing)
+import time
+from collections import OrderedDict
 
 from kivy.app import App
 from kivy.clock import Clock, mainthread
 from kivy.core.window import Window # Import Window here
-from kivy.core.text import LabelBase
-from kivy.properties import BooleanProperty, ListProperty, DictProperty, NumericProperty, StringProperty
+from kivy.core.text import LabelBase, Label as CoreLabel
+from kivy.properties import BooleanProperty, ListProperty, DictProperty, NumericProperty, StringProperty, ObjectProperty
 from kivy.uix.boxlayout import BoxLayout
-from kivy.uix.anchorlayout import AnchorLayout
 from kivy.uix.button import Button
 from kivy.uix.label import Label
-from kivy.uix.relativelayout import RelativeLayout
-from kivy.uix.scrollview import ScrollView
-from kivy.uix.togglebutton import ToggleButton
+from kivy.uix.popup import Popup
+from kivy.uix.textinput import TextInput
+from kivy.uix.recycleview.views import RecycleDataViewBehavior
 from kivy.lang import Builder
 from kivy.metrics import dp # Ensure dp is imported here for use in MainLayout and KV
 
@@ -30,18 +30,31 @@ from gtts import gTTS
 
 # Import configurations and utility functions from our local package
 from .config import (
-    JMDICT_COMMON_FILE, JLPT_LEVELS, REMOTE_JSON_URLS,
     FONT_FILE, BUFFER_SIZE, REVISIONS_FILE, FONT_SIZE_LIST,
     RESIZE_HANDLE_WIDTH_RAW, MIN_PANEL_WIDTH_RAW, MAX_PANEL_WIDTH_RATIO, # Use RAW names
-    BLUE_DOT_DISPLAY_DURATION, KV_FILE # Import KV_FILE
+    BLUE_DOT_DISPLAY_DURATION, KV_FILE, # Import KV_FILE
+    SEARCH_MAX_RESULTS, REVISIONS_EXPORT_FILE, PRERENDER_WORD_TEXTURES, TEXTURE_CACHE_SIZE, PRERENDER_TIMING, UI_BATCH_UPDATES,
+    SEEN_FILTER_FILE, SEEN_FILTER_SAVE_EVERY
+)
+from .utils import ensure_font_downloaded
+from .ui_dispatcher import UIDispatcher
+from .search import PrefixIndex
+from .revisions_io import import_revisions, export_revisions, revision_key, save_revisions_file
+from .jobs import GenerationalExecutor, JobCancelled
+from .seen_filter import SeenFilter, word_key, sample_unseen
+from .sources import SourceError, available_sources, get_source, load_words, make_word_item, take_registry_errors
+from .fonts import (
+    FULL_FONT_NAME, collect_subset_chars, build_font_subset, subset_key, remember_subset, cached_subset,
+    set_full_font_loader, activate_subset, active_subset_chars, font_for_text
 )
-from .utils import download_file_content, is_primarily_katakana, ensure_font_downloaded
 
 # --- Initial Setup ---
 
 # Ensure the font is downloaded and registered
 ensure_font_downloaded()
-LabelBase.register(name="HinaMincho", fn_regular=FONT_FILE)
+# The full font is the fallback for any text outside the active source's font subset.
+# It is only registered (and so loaded) the first time a text needs it.
+set_full_font_loader(lambda: LabelBase.register(name=FULL_FONT_NAME, fn_regular=FONT_FILE))
 
 # Ensure the 'data' directory exists for revisions.json
 DATA_DIR = os.path.dirname(REVISIONS_FILE)
@@ -53,10 +66,44 @@ if not os.path.exists(DATA_DIR):
 # The KV file should be in the same directory as main.py
 Builder.load_file(os.path.join(os.path.dirname(__file__), KV_FILE))
 
+class RevisionRow(RecycleDataViewBehavior, BoxLayout):
+    """
+    One row of the revision list: a ToggleButton switching between the reading and the word,
+    and a 'X' button to remove the entry. Rows are recycled by the RecycleView,
+    so all per-entry state lives in the RecycleView data.
+    """
+    reading = StringProperty('')
+    word = StringProperty('')
+    show_word = BooleanProperty(False) # True while the word is shown instead of the reading
+    font_name = StringProperty(FULL_FONT_NAME)
+    font_size = NumericProperty(FONT_SIZE_LIST)
+    entry = ObjectProperty(None, allownone=True) # The revision entry this row displays
+    owner = ObjectProperty(None, allownone=True) # The RevisionList the row belongs to
+    index = None # Index of the row in the RecycleView data
+
+    def refresh_view_attrs(self, rv, index, data):
+        """
+        Called by the RecycleView when the row is (re)used for another entry.
+        """
+        self.index = index
+        return super().refresh_view_attrs(rv, index, data)
+
+    def toggle(self):
+        """
+        Switches between the reading and the word, remembering the choice in the data.
+        """
+        self.show_word = not self.show_word
+        if self.owner is not None and self.index is not None:
+            self.owner.ids.rv.data[self.index]['show_word'] = self.show_word
+
+    def remove(self):
+        if self.owner is not None:
+            self.owner.remove(self.entry)
+
 class RevisionList(BoxLayout):
     """
     A custom BoxLayout for displaying the list of marked words for revision.
-    It includes a scrollable grid of ToggleButtons and remove buttons.
+    It includes a RecycleView of revision rows, so only the visible rows are widgets.
     """
     revisions = ListProperty() # List of revision entries
     remove_callback = None # Callback function to remove an entry
@@ -70,58 +117,21 @@ class RevisionList(BoxLayout):
 
     def populate(self):
         """
-        Clears and repopulates the GridLayout with revision entries.
-        Each entry gets a ToggleButton (to switch between reading and word)
+        Rebuilds the RecycleView data from the revision entries.
+        Each entry gets a row with a ToggleButton (to switch between reading and word)
         and a 'X' button to remove it.
         """
-        grid = self.ids.grid
-        grid.clear_widgets() # Clear existing widgets
-        for entry in self.revisions:
-            reading = entry.get('reading','')
-            word = entry.get('word','')
-            
-            # ToggleButton to display reading/word
-            btn = ToggleButton(
-                text=reading,
-                font_name='HinaMincho',
-                font_size=FONT_SIZE_LIST,
-                size_hint_y=None,
-                height=dp(40), # Use dp for consistent sizing across devices
-                background_normal='', # No background for normal state
-                background_down='', # No background for pressed state
-                background_color=(0, 0, 0, 0), # Explicitly set transparent background color
-                color=(1, 1, 1, 1), # White text color
-                halign='left', # Align text to the left
-                valign='middle', # Vertically align text to the middle
-                padding=(dp(5), 0), # Add some left padding
-                # IMPORTANT: Set text_size to the button's actual size to enable halign
-                text_size=self.size # This will be updated by Kivy's layout system
-            )
-            # Bind button press to toggle text between reading and word
-            btn.bind(on_press=lambda inst, rd=reading, w=word: setattr(inst, 'text', w if inst.text==rd else rd))
-            
-            # Bind to the button's size to update text_size when it changes
-            # This is crucial because self.size is not immediately available when the widget is created
-            btn.bind(size=lambda instance, value: setattr(instance, 'text_size', value))
-
-            # Button to remove the entry
-            remove_btn = Button(
-                text='X',
-                size_hint=(None,None),
-                size=(dp(30),dp(30)), # Use dp for consistent sizing - ensures it's squarish
-                background_normal='', # No background for normal state
-                background_down='', # No background for pressed state
-                background_color=(0, 0, 0, 0), # Explicitly set transparent background color
-                color=(0.6, 0.6, 0.6, 1) # Grey text color for 'X'
-            )
-            # Bind remove button to call the remove callback
-            remove_btn.bind(on_release=lambda inst, e=entry: self.remove(e))
-            
-            # Create a horizontal row for each entry
-            row = BoxLayout(size_hint_y=None, height=dp(40)) # Use dp for height
-            row.add_widget(btn)
-            row.add_widget(remove_btn)
-            grid.add_widget(row) # Add the row to the grid
+        self.ids.rv.data = [
+            {
+                'reading': entry.get('reading', ''),
+                'word': entry.get('word', ''),
+                'show_word': False,
+                'font_name': font_for_text(entry.get('reading', '') + entry.get('word', '')), # The button shows both texts
+                'entry': entry,
+                'owner': self,
+            }
+            for entry in self.revisions
+        ]
 
     def remove(self, entry):
         """
@@ -130,6 +140,71 @@ class RevisionList(BoxLayout):
         if self.remove_callback:
             self.remove_callback(entry)
 
+class PrerenderedLabel(Label):
+    """
+    A Label that can render the texture for a text ahead of time.
+    When its text changes to one that was pre-rendered, the ready texture is swapped in
+    instead of rasterizing the glyphs at that moment.
+    """
+    _texture_cache = None # OrderedDict of (font name, text) -> texture, most recently used last
+
+    def __init__(self, **kwargs):
+        self._texture_cache = OrderedDict()
+        self.update_times = [] # ('cached' or 'rendered', seconds) per texture update, if PRERENDER_TIMING is on
+        super().__init__(**kwargs)
+        # Textures rendered with other font settings can't be reused
+        self.fbind('font_size', self.clear_texture_cache)
+        self.fbind('color', self.clear_texture_cache)
+
+    def clear_texture_cache(self, *args):
+        self._texture_cache.clear()
+
+    def on_text(self, instance, text):
+        """
+        Picks the font subset if it covers the new text, otherwise the full font.
+        """
+        self.font_name = font_for_text(text)
+
+    def prerender(self, text):
+        """
+        Renders the texture for a text with this label's font settings and caches it.
+        Must be called on the main thread, since textures are OpenGL objects.
+        """
+        if not PRERENDER_WORD_TEXTURES or not text:
+            return
+        key = (font_for_text(text), text)
+        if key in self._texture_cache:
+            self._texture_cache.move_to_end(key)
+            return
+        options = {name: getattr(self, name) for name in self._font_properties}
+        options['text'] = text
+        options['font_name'] = key[0]
+        core_label = CoreLabel(**options)
+        core_label.refresh()
+        self._texture_cache[key] = core_label.texture
+        while len(self._texture_cache) > TEXTURE_CACHE_SIZE:
+            self._texture_cache.popitem(last=False) # Evict the least recently used texture
+
+    def texture_update(self, *largs):
+        """
+        Uses the pre-rendered texture for the current text if there is one,
+        otherwise renders it like a normal Label.
+        """
+        start = time.perf_counter()
+        key = (self.font_name, self.text)
+        texture = self._texture_cache.get(key)
+        if texture is not None and not self.disabled and not self.markup:
+            self._texture_cache.move_to_end(key)
+            self.texture = texture
+            self.texture_size = list(texture.size)
+        else:
+            super().texture_update(*largs)
+        if PRERENDER_TIMING:
+            source = 'cached' if texture is not None else 'rendered'
+            elapsed = time.perf_counter() - start
+            self.update_times.append((source, elapsed))
+            print(f"PrerenderedLabel: {source} texture for '{self.text}' in {elapsed * 1000:.2f} ms")
+
 class MainLayout(BoxLayout):
     """
     The main application layout, handling word fetching, display,
@@ -148,6 +223,7 @@ class MainLayout(BoxLayout):
     resize_handle_width = NumericProperty(dp(RESIZE_HANDLE_WIDTH_RAW)) # Width of the draggable handle
     
     _cursor_on_handle = BooleanProperty(False) # Internal flag to track if cursor is on handle
+    _last_motion_pos = None # Latest mouse position, processed once per frame by _update_hover_cursor
 
     # New properties for revision session
     in_revision_mode = BooleanProperty(False) # True if currently in a revision session
@@ -168,10 +244,40 @@ class MainLayout(BoxLayout):
         Initializes the MainLayout. Loads revisions, starts word loading,
         and schedules the first word display.
         """
-        super().__init__(**kwargs)
+        self.ui = UIDispatcher(UI_BATCH_UPDATES) # Batches UI updates from worker threads into one per frame
+        self._revision_search_index = None # PrefixIndex over self.revisions, built by _rebuild_revision_index
+        self._revision_index_version = 0 # Number of the latest revision index rebuild started
+        self._revision_index_published = 0 # Number of the rebuild self._revision_search_index comes from
+        self._revision_keys = set() # (reading, word) pairs of self.revisions, filled by load_revisions
+        self._saved_revision_keys = set() # Keys in REVISIONS_FILE when it was last read or written
         self.load_revisions() # Load previously saved revisions and source preference
+        # Use the subset built for this source last time. This happens before the kv rules are
+        # applied, so not even the first frame's placeholder texts need the full font.
+        cached = cached_subset(self.current_source)
+        if cached:
+            self._register_font_subset(*cached)
+        super().__init__(**kwargs)
+        self._awaiting_buffer = False # True while try_next waits for buffer_task to fill the buffer
+        self._hover_trigger = Clock.create_trigger(self._update_hover_cursor, 0) # Coalesces mouse moves
+        self._source_search_index = None # PrefixIndex over self.words, built by the loader thread
+        self._indexed_words = (None, None) # (word list, PrefixIndex) last built by the loader, base of update patches
+        self._revision_file_path = REVISIONS_EXPORT_FILE # Last file used for import/export
+        self._loader = GenerationalExecutor(name='source-load') # Runs source loads, newest selection wins
+        self._font_builder = GenerationalExecutor(name='font-subset') # Builds font subsets, apart from the loads
+        self._buffer_lock = threading.Lock() # Guards the buffer against appends from stale buffer tasks
+        self._words_generation = 0 # Generation of the load self.words came from
+        self._words_source = None # Name of the source self.words came from
+        self._word_positions = None # Key of each word -> index in self.words, for sources with a key_field
+        self._seen = SeenFilter(SEEN_FILTER_FILE) # Words shown recently, also in previous sessions
+        self._shown_since_save = 0 # Words added to self._seen since it was last saved
+        self._refresh_font_names()
+        self._populate_source_panel()
+        # Misconfigured sources and failed plugins were skipped; tell the user once the window is up
+        registry_errors = take_registry_errors()
+        if registry_errors:
+            self.ui.call(self._show_registry_errors, registry_errors)
         # Initial load based on saved preference or default
-        threading.Thread(target=self._load_words_from_source, daemon=True).start()
+        self._loader.submit(self._load_words_from_source, self.current_source)
         
         # Bind keyboard events for shortcuts
         Window.bind(on_key_down=self._on_keyboard_down)
@@ -180,6 +286,9 @@ class MainLayout(BoxLayout):
         """
         Handles keyboard key down events for shortcuts.
         """
+        # Let the search box receive the keys while the user is typing in it
+        if self.ids.search_input.focus:
+            return False
         # Check for spacebar (key code 32) or right arrow key (key code 275)
         if key == 32 or key == 275:
             # Ensure play_audio_btn is enabled for keyboard shortcut too
@@ -249,27 +358,37 @@ class MainLayout(BoxLayout):
     def on_motion(self, etype, motion):
         """
         Handles general motion events, used for changing the cursor on hover.
+        Only the latest mouse position is kept, the hover check itself runs at most once per frame.
         """
         # Only process 'update' events for continuous hover detection and if it's a mouse motion (not touch)
         if etype == 'update' and motion.is_mouse_motion:
-            # Only change cursor if the revision panel is open, not currently resizing, and NOT in revision mode
-            if self.ids.rev_panel.width > 0 and not self.resizing and not self.in_revision_mode: 
-                if self.ids.resize_handle.collide_point(*motion.pos):
-                    if not self._cursor_on_handle:
-                        Window.system_cursor = 'size_we' # Set resize cursor
-                        self._cursor_on_handle = True
-                else:
-                    if self._cursor_on_handle:
-                        Window.system_cursor = 'arrow' # Revert to default cursor
-                        self._cursor_on_handle = False
-            else: # If panel is closed, resizing, or in revision mode, ensure cursor is default
-                if self._cursor_on_handle:
-                    Window.system_cursor = 'arrow'
-                    self._cursor_on_handle = False
+            self._last_motion_pos = motion.pos
+            self._hover_trigger()
         
         # Call super to ensure other widgets get motion events
         return super().on_motion(etype, motion)
 
+    def _update_hover_cursor(self, dt):
+        """
+        Updates the cursor for the latest mouse position. Scheduled by on_motion.
+        """
+        if self._last_motion_pos is None:
+            return
+        # Only change cursor if the revision panel is open, not currently resizing, and NOT in revision mode
+        if self.ids.rev_panel.width > 0 and not self.resizing and not self.in_revision_mode: 
+            if self.ids.resize_handle.collide_point(*self._last_motion_pos):
+                if not self._cursor_on_handle:
+                    Window.system_cursor = 'size_we' # Set resize cursor
+                    self._cursor_on_handle = True
+            else:
+                if self._cursor_on_handle:
+                    Window.system_cursor = 'arrow' # Revert to default cursor
+                    self._cursor_on_handle = False
+        else: # If panel is closed, resizing, or in revision mode, ensure cursor is default
+            if self._cursor_on_handle:
+                Window.system_cursor = 'arrow'
+                self._cursor_on_handle = False
+
     @mainthread
     def play_current_audio(self):
         """
@@ -356,187 +475,333 @@ class MainLayout(BoxLayout):
             self.revisions = []
             self.current_source = 'JMdict' # Default to JMdict if file doesn't exist
 
-        # Schedule UI update for the source button text after loading preference
-        Clock.schedule_once(lambda dt: self._update_select_source_button_text(), 0.1)
+        # Hash set of (reading, word) pairs for constant time duplicate checks
+        self._revision_keys = {(e.get('reading',''), e.get('word','')) for e in self.revisions}
+        self._saved_revision_keys = set(self._revision_keys)
+        self._rebuild_revision_index()
+
+        # Queue UI update for the source button text after loading preference
+        self.ui.call(self._update_select_source_button_text)
 
 
     def save_revisions(self):
         """
-        Saves the current list of revision words and the preferred word source to a JSON file.
+        Saves the revision words and the preferred word source to the JSON file.
+        The drill server (server.py) writes to the same file, so only the words added and
+        removed here since the last save are applied to the file as it is on disk;
+        words the server marked meanwhile are kept, and show up in the list afterwards.
         """
+        added = [e for e in self.revisions if revision_key(e) not in self._saved_revision_keys]
+        removed = self._saved_revision_keys - self._revision_keys
         try:
-            data = {
-                'revisions': self.revisions,
-                'current_source': self.current_source # Save the current source
-            }
-            with open(REVISIONS_FILE,'w',encoding='utf-8') as f:
-                json.dump(data,f,ensure_ascii=False,indent=2)
+            merged = save_revisions_file(REVISIONS_FILE, added, removed, current_source=self.current_source)
         except Exception as e:
             print(f"Error saving revisions: {e}")
+            return
+        self._saved_revision_keys = {revision_key(e) for e in merged}
+        if self._saved_revision_keys != self._revision_keys:
+            print(f"Merged {len(self._saved_revision_keys - self._revision_keys)} revisions saved by another process.")
+            self._revision_keys = set(self._saved_revision_keys)
+            self.revisions = merged
+            self._rebuild_revision_index()
 
-    @mainthread
     def _update_select_source_button_text(self):
         """
         Updates the text of the main 'Select Source' button based on the current source.
+        Must be called on the main thread (directly or through self.ui.call).
         """
-        if self.current_source == 'JMdict':
-            self.ids.select_source_btn.text = 'Source: JMdict'
-        elif self.current_source.startswith('JLPT'):
-            self.ids.select_source_btn.text = f'Source: {self.current_source}'
+        source = get_source(self.current_source)
+        if source is not None:
+            self.ids.select_source_btn.text = f'Source: {source.label}'
         else:
             self.ids.select_source_btn.text = 'Select Source' # Fallback
 
-    def _load_words_from_source(self):
+    def _load_words_from_source(self, job, source_name):
         """
-        Loads words based on the current source preference (JMdict or JLPT level).
+        Loads words from a registered word source (see sources.py). Runs as a job on self._loader:
+        if another source is selected meanwhile, the job is cancelled between chunks,
+        and its results are only published if it is still the latest job.
         """
-        self.words = [] # Clear existing words
-        self.buffer = [] # Clear buffer
         # Clear current word display and disable buttons during loading
-        Clock.schedule_once(lambda dt: setattr(self.ids.word_label, 'text', "Loading words..."), 0.1)
-        Clock.schedule_once(lambda dt: setattr(self.ids.show_btn, 'disabled', True), 0.1)
-        Clock.schedule_once(lambda dt: setattr(self.ids.next_btn, 'disabled', True), 0.1)
-        Clock.schedule_once(lambda dt: setattr(self.ids.mark_btn, 'disabled', True), 0.1)
-
-        if self.current_source == 'JMdict':
-            self._load_from_jmdict_e()
-        elif self.current_source.startswith('JLPT'):
-            try:
-                level = int(self.current_source.replace('JLPT', ''))
-                self._load_from_jlpt_level(level)
-            except ValueError:
-                print(f"Invalid JLPT source format: {self.current_source}")
-                Clock.schedule_once(lambda dt: self.display_error_message("Invalid JLPT source!"), 0.1)
-        else:
-            print(f"Unknown source: {self.current_source}. Defaulting to JMdict.")
-            self.current_source = 'JMdict'
-            self._load_from_jmdict_e()
+        self.ui.set(self.ids.word_label, text="Loading words...")
+        self._disable_word_buttons()
 
+        source = get_source(source_name)
+        if source is None:
+            print(f"Unknown source: {source_name}. Defaulting to JMdict.")
+            self.ui.call(setattr, self, 'current_source', 'JMdict')
+            source = get_source('JMdict')
 
-        if self.words:
-            for _ in range(BUFFER_SIZE): threading.Thread(target=self.buffer_task,daemon=True).start()
-            Clock.schedule_once(lambda dt: self.try_next(), 0.1)
-        else:
-            print("Word list is empty after loading. The app may not display words correctly.")
-            Clock.schedule_once(lambda dt: self.display_error_message("No words loaded from source!"), 0.1)
-
-    def _load_from_jmdict_e(self):
-        """
-        Loads JMdict words from the specified XML file using regex parsing.
-        Assumes the file is already present.
-        """
-        print("Loading from JMdict_e...")
-        # Check if the JMdict file exists in the resources directory
-        jmdict_path = os.path.join(os.path.dirname(__file__), JMDICT_COMMON_FILE)
-        if not os.path.exists(jmdict_path):
-            print(f"Error: {jmdict_path} not found.")
-            Clock.schedule_once(lambda dt: self.display_error_message(f"Error: {JMDICT_COMMON_FILE} not found!"), 0.1)
+        try:
+            words = load_words(source, job.check)
+        except JobCancelled:
+            raise
+        except SourceError as e:
+            self._report_load_error(job, str(e))
+            return
+        except IOError as e:
+            print(f"IO Error reading {source.label}: {e}")
+            self._report_load_error(job, f"IO Error: {e}")
+            return
+        except Exception as e:
+            print(f"An unexpected error occurred while loading {source.label} words: {e}")
+            self._report_load_error(job, f"Unexpected Error: {e}")
             return
 
+        job.check()
+        if not words:
+            print("Word list is empty after loading. The app may not display words correctly.")
+            self._report_load_error(job, "No words loaded from source!")
+            return
+        # Position of each word by its key, so later updates can patch the list in place
+        positions = None
+        if source.key_field:
+            positions = {item['meta'][source.key_field]: i for i, item in enumerate(words)
+                         if source.key_field in item.get('meta', {})}
+        self.ui.call(self._publish_words, job, words, source.name, positions)
+
+        # Index the new words for the search box once the first words are on their way
+        search_index = PrefixIndex.from_words(words)
+        print(f"Built search index with {len(search_index)} keys.")
+        job.check()
+        self._indexed_words = (words, search_index)
+        self.ui.call(self._publish_search_index, job, search_index)
+
+        # Switch to a font subset covering the new words and the revisions. fontTools can't be
+        # interrupted, so the subset is built on its own executor and never holds up the next load.
+        job.check()
+        self._font_builder.submit(self._build_font_subset, job, source.name, words + list(self._revision_words()))
+
+    def _revision_words(self):
+        """
+        Yields the revisions in the word entry format, for collect_subset_chars.
+        """
+        for entry in list(self.revisions):
+            yield {'japanese': [{'reading': entry.get('reading', ''), 'word': entry.get('word', '')}]}
+
+    def _build_font_subset(self, font_job, load_job, source_name, words):
+        """
+        Builds (or finds in the cache) the font subset covering the given words and activates it.
+        Runs as a job on self._font_builder. Nothing is activated if the load that asked for it
+        has been superseded in the meantime.
+        """
+        load_job.check()
+        chars = collect_subset_chars(words)
+        load_job.check()
+        subset_path = build_font_subset(chars)
+        font_job.check()
+        load_job.check()
+        if subset_path:
+            remember_subset(source_name, subset_path, chars)
+            self.ui.call(self._activate_font_subset, load_job, subset_path, chars)
+
+    def _publish_words(self, job, words, source_name, positions):
+        """
+        Makes the words loaded by a job the active word list and starts filling the buffer.
+        Runs on the main thread. Results from superseded jobs are dropped.
+        """
+        if not self._loader.is_current(job):
+            print(f"Dropping words from superseded load (generation {job.generation}).")
+            return
+        with self._buffer_lock:
+            self._words_generation = job.generation # Buffer tasks of older generations won't append anymore
+            self.words = words
+            self.buffer = []
+        self._words_source = source_name
+        self._word_positions = positions
+        for _ in range(BUFFER_SIZE): threading.Thread(target=self.buffer_task,args=(job.generation,),daemon=True).start()
+        self.try_next()
+
+    def _update_words_from_source(self, job, source_name):
+        """
+        Syncs the loaded words with the latest version of their source and patches the word list,
+        the search index and the font subset with the changes, instead of reloading everything.
+        Runs as a job on self._loader.
+        """
+        source = get_source(source_name)
         try:
-            file_size_bytes = os.path.getsize(jmdict_path)
-            file_size_mb = file_size_bytes / (1024 * 1024)
-            print(f"Loading words from {jmdict_path} (Size: {file_size_mb:.2f} MB)...")
-            
-            with open(jmdict_path, 'r', encoding='utf-8') as file:
-                full_content = file.read()
-            
-            # Split the content into individual entries
-            # The Tkinter script splits by '<entry>', so we'll do the same.
-            # We skip the first element as it's usually empty or preamble before the first <entry>
-            dictionary_entries_raw = full_content.split('<entry>')[1:] 
-            
-            loaded_words = []
-            kanji_pattern = re.compile(r'<keb>(.*?)</keb>')
-            reading_pattern = re.compile(r'<reb>(.*?)</reb>')
-
-            for entry_text in dictionary_entries_raw:
-                kanji = ''
-                reading = ''
-
-                # Find the first kanji
-                kanji_match = kanji_pattern.search(entry_text)
-                if kanji_match:
-                    kanji = kanji_match.group(1).strip()
-
-                # Find the first reading
-                reading_match = reading_pattern.search(entry_text)
-                if reading_match:
-                    reading = reading_match.group(1).strip()
-                
-                # New filtering logic: Skip if no kanji and the reading is primarily katakana
-                if not kanji and is_primarily_katakana(reading):
+            diff = source.update(job.check)
+        except JobCancelled:
+            raise
+        except Exception as e:
+            print(f"Error updating {source.label}: {e}")
+            self._report_load_error(job, f"Update Error: {e}")
+            return
+        if not len(diff):
+            print(f"{source.label} is up to date.")
+            source.commit_update(diff) # Records the new file info, if only that changed
+            return
+
+        # Patch the search index here rather than on the main thread: one merge pass over a copy
+        search_index = None
+        indexed_words, base_index = self._indexed_words
+        if indexed_words is self.words and base_index is not None:
+            start = time.perf_counter()
+            added = [(reading, kanji) for reading, kanji in list(diff.added.values()) + list(diff.changed.values())
+                     if make_word_item(reading, kanji) is not None]
+            search_index = base_index.patched(added, diff.removed.values())
+            print(f"Patched search index ({len(search_index)} keys) in {(time.perf_counter() - start) * 1000:.1f} ms.")
+        job.check()
+        self.ui.call(self._apply_word_diff, job, diff, source, search_index)
+
+        # Extend the font subset if the new words use characters it doesn't cover
+        covered = active_subset_chars()
+        if covered is not None:
+            new_words = [{'japanese': [{'reading': reading, 'word': kanji}]}
+                         for reading, kanji in list(diff.added.values()) + list(diff.changed.values())]
+            if not covered.issuperset(collect_subset_chars(new_words)):
+                covered_words = [{'japanese': [{'reading': ''.join(covered), 'word': ''}]}]
+                job.check()
+                self._font_builder.submit(self._build_font_subset, job, source.name, covered_words + new_words)
+
+    def _apply_word_diff(self, job, diff, source, search_index):
+        """
+        Patches self.words and the buffer with a source diff, swaps in the search index the job
+        patched, then has the source store the diff. Runs on the main thread. A diff from a
+        superseded job isn't stored either, so the next update finds the same changes again.
+        Removed words are swapped with the last word so each removal is O(1).
+        """
+        if not self._loader.is_current(job) or self._words_source != source.name or self._word_positions is None:
+            print(f"Dropping {source.label} update from superseded job (generation {job.generation}).")
+            return
+        key_field = source.key_field
+        words = self.words
+        positions = self._word_positions
+        start = time.perf_counter()
+
+        with self._buffer_lock:
+            for key, (reading, kanji) in diff.removed.items():
+                i = positions.pop(key, None)
+                if i is None:
+                    continue # The word was filtered out when it was loaded
+                last = words.pop()
+                if i < len(words):
+                    words[i] = last
+                    positions[last['meta'][key_field]] = i
+
+            for key, (reading, kanji) in list(diff.added.items()) + list(diff.changed.items()):
+                item = make_word_item(reading, kanji, {key_field: key})
+                if item is None:
                     continue
+                positions[key] = len(words)
+                words.append(item)
+
+            # Buffered words that were removed or changed would still show their old version
+            buffered = len(self.buffer)
+            if diff.removed:
+                self.buffer = [entry for entry in self.buffer if not self._is_outdated(entry)]
+            dropped = buffered - len(self.buffer)
+        for _ in range(dropped): threading.Thread(target=self.buffer_task,args=(self._words_generation,),daemon=True).start()
+
+        if search_index is not None:
+            self._indexed_words = (words, search_index)
+            self._source_search_index = search_index
+        else:
+            # The job had no index of these words to patch, so index them from scratch off the UI thread
+            self._source_search_index = None
+            self._loader.submit_task(self._rebuild_search_index, words, list(words))
 
-                # Only add if we have at least a reading or a kanji (after filtering)
-                if kanji or reading:
-                    loaded_words.append({'japanese': [{'reading': reading, 'word': kanji}]})
-            
-            self.words = loaded_words
-            print(f"Loaded {len(self.words)} words from JMdict XML using regex parsing.")
+        # Runs on the loader after this job and before any later load or update
+        self._loader.submit_task(source.commit_update, diff)
+        print(f"Applied {source.label} update ({diff}) in {(time.perf_counter() - start) * 1000:.1f} ms. {len(words)} words.")
 
-        except IOError as e:
-            print(f"IO Error reading {jmdict_path}: {e}")
-            Clock.schedule_once(lambda dt: self.display_error_message(f"IO Error: {e}"), 0.1)
-        except Exception as e:
-            print(f"An unexpected error occurred while loading JMdict words: {e}")
-            Clock.schedule_once(lambda dt: self.display_error_message(f"Unexpected Error: {e}"), 0.1)
-
-    def _load_from_jlpt_level(self, level):
+    def _rebuild_search_index(self, words, snapshot):
         """
-        Loads JLPT words for a specific level from the GitHub CSV API.
+        Indexes a snapshot of a word list and publishes the index if the list is still the active one.
+        Runs as a task on self._loader.
         """
-        print(f"Loading from JLPT N{level} (GitHub CSV API)...")
-        jlpt_words = []
-        csv_url = REMOTE_JSON_URLS.get(level) # Get the URL for the specific level
-
-        if not csv_url:
-            print(f"No URL found for JLPT N{level}.")
-            Clock.schedule_once(lambda dt: self.display_error_message(f"No URL for JLPT N{level}!"), 0.1)
-            return
-
-        csv_content = download_file_content(csv_url) # Use the new download function from utils
+        search_index = PrefixIndex.from_words(snapshot)
+        print(f"Rebuilt search index with {len(search_index)} keys.")
+        self._indexed_words = (words, search_index)
+        self.ui.call(self._swap_search_index, words, search_index)
 
-        if csv_content:
-            # Split content into lines and skip the header (first line)
-            lines = csv_content.strip().split('\n')[1:] 
-            for line in lines:
-                parts = line.split(',') # Split by comma
-                if len(parts) >= 2: # Ensure we have at least 'expression' and 'reading'
-                    expression = parts[0].strip() # First part is 'expression' (kanji)
-                    reading = parts[1].strip()    # Second part is 'reading'
+    def _swap_search_index(self, words, search_index):
+        """
+        Makes a rebuilt search index active, unless its words were replaced meanwhile. Runs on the main thread.
+        """
+        if self.words is words:
+            self._source_search_index = search_index
 
-                    # Apply the same Katakana filtering logic from utils
-                    if not expression and is_primarily_katakana(reading):
-                        continue
+    def _publish_search_index(self, job, search_index):
+        """
+        Makes the search index built by a job active. Runs on the main thread.
+        """
+        if self._loader.is_current(job):
+            self._source_search_index = search_index
 
-                    if expression or reading:
-                        # Reconstruct into the expected {'japanese': [{'reading': ..., 'word': ...}]} format
-                        jlpt_words.append({'japanese': [{'reading': reading, 'word': expression}]})
-        else:
-            print(f"No content or malformed response from CSV API for JLPT N{level}.")
-        
-        self.words = jlpt_words
-        print(f"Loaded {len(self.words)} words from JLPT N{level}.")
+    def _report_load_error(self, job, message):
+        """
+        Displays a loading error, unless the job has been superseded by a newer load.
+        """
+        if self._loader.is_current(job):
+            self.display_error_message(message)
 
-        if len(self.words) == 0:
-            Clock.schedule_once(lambda dt: self.display_error_message(f"No words loaded from JLPT N{level}!"), 0.1)
+    def _populate_source_panel(self):
+        """
+        Creates one button per registered word source in the source selection panel.
+        """
+        panel = self.ids.source_buttons_panel
+        panel.clear_widgets()
+        sources = available_sources()
+        for source in sources:
+            btn = Button(
+                text=source.label,
+                size_hint_y=None,
+                height=dp(30),
+                background_normal='',
+                background_color=(.23, .25, .27, 1)
+            )
+            btn.bind(on_release=lambda inst, name=source.name: self.set_source(name))
+            panel.add_widget(btn)
+        panel.height = dp(30) * len(sources) + panel.spacing * max(len(sources) - 1, 0)
+
+    def _show_registry_errors(self, errors):
+        """
+        Shows the problems found while registering the word sources in a popup,
+        which stays open until the user dismisses it.
+        """
+        message = Label(text='\n'.join(errors), halign='left', valign='top', color=(1, .4, .4, 1))
+        message.bind(size=lambda label, size: setattr(label, 'text_size', size))
+        ok_btn = Button(text='OK', size_hint_y=None, height=dp(40),
+                        background_normal='', background_color=(.2, .42, .89, 1))
+        content = BoxLayout(orientation='vertical', spacing=dp(10), padding=dp(10))
+        content.add_widget(message)
+        content.add_widget(ok_btn)
+        popup = Popup(title='Some word sources could not be added', content=content,
+                      size_hint=(None, None), size=(dp(560), dp(140) + dp(22) * len(errors)),
+                      auto_dismiss=False)
+        ok_btn.bind(on_release=popup.dismiss)
+        popup.open()
 
     def set_source(self, source_name):
         """
         Sets the current word source, saves the preference, and reloads words.
         """
+        same_source = source_name == self.current_source
         self.current_source = source_name
         print(f"Set word source to: {self.current_source}")
         self._update_select_source_button_text() # Update button text immediately
         self.save_revisions() # Save preference
         self.toggle_source_panel() # Hide the source selection panel after selection
+
+        # Selecting the loaded source again only applies its changes, if it can report them
+        source = get_source(source_name)
+        if same_source and self._words_source == source_name and self.words and source is not None and source.key_field:
+            self._loader.submit(self._update_words_from_source, source_name)
+            return
         
-        # Clear current word and buffer, then reload from the new source
+        # Clear current word and buffer, then reload from the new source.
+        # Submitting supersedes any load still running for a previous selection.
         self.current = {}
-        self.buffer = []
-        Clock.schedule_once(lambda dt: setattr(self.ids.word_label, 'text', "Switching source..."), 0.1)
-        threading.Thread(target=self._load_words_from_source, daemon=True).start()
+        with self._buffer_lock:
+            self._words_generation = 0 # No words until the new load publishes them
+            self.words = []
+            self.buffer = []
+        self._words_source = None
+        self._word_positions = None
+        self._source_search_index = None # Stale until the new words are indexed
+        self.ui.set(self.ids.word_label, text="Switching source...")
+        self._loader.submit(self._load_words_from_source, self.current_source)
 
     def toggle_source_panel(self):
         """
@@ -561,19 +826,46 @@ class MainLayout(BoxLayout):
             pass
 
 
-    def buffer_task(self):
+    def buffer_task(self, generation):
         """
         Fetches a single word entry and adds it to the buffer.
         Runs in a separate thread to keep the UI responsive.
+        The entry is dropped if the words were replaced by another load in the meantime.
         """
         print("buffer_task: Attempting to fetch entry...")
         entry = self.fetch_entry()
         if entry:
-            self.buffer.append(entry)
+            with self._buffer_lock:
+                if generation != self._words_generation:
+                    print("buffer_task: Words changed since the task started, dropping entry.")
+                    return
+                if self._is_outdated(entry):
+                    # Same words, but this one was removed or changed by an update: fetch another
+                    # one, or the buffer would stay a slot short for good
+                    print("buffer_task: Entry changed by a source update, fetching another one.")
+                    threading.Thread(target=self.buffer_task,args=(generation,),daemon=True).start()
+                    return
+                self.buffer.append(entry)
             print(f"buffer_task: Appended entry to buffer. Buffer size: {len(self.buffer)}")
+            # Render the word's textures in the next frame, well before it is displayed
+            self.ui.call(self._prerender_entry, entry)
+            # Wake up try_next if it is waiting for a word
+            if self._awaiting_buffer:
+                self.ui.call(self._on_buffer_filled)
         else:
             print("buffer_task: fetch_entry returned None.")
 
+    def _is_outdated(self, entry):
+        """
+        Checks if a word entry was removed or replaced by a source update since it was fetched.
+        Only sources with a key_field are updated. Call with self._buffer_lock held.
+        """
+        positions = self._word_positions
+        if positions is None or 'meta' not in entry:
+            return False
+        i = positions.get(entry['meta'].get(get_source(self._words_source).key_field))
+        return i is None or self.words[i] is not entry
+
     def fetch_entry(self):
         """
         Fetches a random word entry from the loaded JMdict data.
@@ -584,8 +876,8 @@ class MainLayout(BoxLayout):
             print("fetch_entry: self.words is empty, cannot fetch.")
             return None
         
-        # Select a random entry from the pre-processed list
-        item = random.choice(self.words)
+        # Select a random entry from the pre-processed list, skipping recently shown words
+        item = sample_unseen(self.words, self._seen)
         
         # 'item' is already in the expected format, so no need for further parsing here.
         # Just return it directly.
@@ -609,29 +901,51 @@ class MainLayout(BoxLayout):
 
         return item 
 
-    @mainthread
     def try_next(self):
         """
         Attempts to display the next word from the buffer. If the buffer is empty,
-        it schedules itself to try again shortly. This is for normal mode.
+        it waits for buffer_task to signal a new word instead of polling. This is for normal mode.
+        Must be called on the main thread (directly or through self.ui.call).
         """
         if self.in_revision_mode: return # Do not run in revision mode
 
+        # Set before checking the buffer, so a word appended right after the check still wakes us up
+        self._awaiting_buffer = True
         if self.buffer:
+            self._awaiting_buffer = False
             self.next_word() # Display next word if available
         else:
             # If self.words is empty, it means the loading failed. Display error.
             if not self.words:
+                self._awaiting_buffer = False
                 print("No words available to display. Please check the JMdict file.")
-                setattr(self.ids.word_label, 'text', "No words loaded!") # This message is already set by display_error_message
-                setattr(self.ids.show_btn, 'disabled', True)
-                setattr(self.ids.next_btn, 'disabled', True)
-                setattr(self.ids.mark_btn, 'disabled', True)
+                self.ui.set(self.ids.word_label, text="No words loaded!") # This message is already set by display_error_message
+                self._disable_word_buttons()
                 return # Stop trying if no words are loaded
 
-            # If self.words is populated but buffer is empty, wait for buffer_task to fill it.
-            print(f"Buffer is empty ({len(self.buffer)} words), but words list has {len(self.words)} words. Retrying in 0.1s...")
-            Clock.schedule_once(lambda dt: self.try_next(),0.1)
+            if not self.ui.batched:
+                # Old behaviour, kept for comparison: poll the buffer every 0.1s
+                self._awaiting_buffer = False
+                Clock.schedule_once(self._poll_buffer, 0.1)
+                return
+            # If self.words is populated but buffer is empty, buffer_task will call _on_buffer_filled.
+            print(f"Buffer is empty ({len(self.buffer)} words), but words list has {len(self.words)} words. Waiting for buffer...")
+
+    def _poll_buffer(self, dt):
+        """
+        Polling retry of try_next, only used when UI_BATCH_UPDATES is off.
+        """
+        self.ui.count_wakeup()
+        self.try_next()
+
+    def _on_buffer_filled(self):
+        """
+        Called on the main thread by buffer_task when a word was added to the buffer.
+        Retries try_next only if it is still waiting, so several words arriving at once
+        only advance the display once.
+        """
+        if self._awaiting_buffer:
+            self.try_next()
 
     @mainthread
     def next_word(self):
@@ -645,29 +959,176 @@ class MainLayout(BoxLayout):
             if not self.buffer: 
                 print("next_word: Buffer is empty, cannot display next word.")
                 return # Do nothing if buffer is empty
-            self.current=self.buffer.pop(0) # Get the next word from the buffer
+            with self._buffer_lock:
+                self.current=self.buffer.pop(0) # Get the next word from the buffer
             # The structure of self.current is now directly from the processed XML.
             # It's already in the {'japanese': [{'reading': reading, 'word': kanji}]} format.
-            jap=self.current.get('japanese',[{}])[0] # Extract Japanese word data
-            self.ids.word_label.text=jap.get('reading','...') # Display the reading
-            
-            # Enable/disable buttons based on current state.
-            self.ids.show_btn.disabled=False
-            self.ids.next_btn.disabled=True
-            self.ids.mark_btn.disabled=False
-            
-            # Show the blue dot when a new word (reading) is displayed
-            self.ids.blue_dot.opacity = 1
-            # Schedule the blue dot to disappear after BLUE_DOT_DISPLAY_DURATION
-            Clock.schedule_once(self._hide_blue_dot, BLUE_DOT_DISPLAY_DURATION)
+            self._display_current_reading()
             
             # Start a new thread to replenish the buffer.
-            threading.Thread(target=self.buffer_task,daemon=True).start()
+            threading.Thread(target=self.buffer_task,args=(self._words_generation,),daemon=True).start()
 
-            # Automatically play TTS audio for the new word
-            self.play_current_audio()
+    def _display_current_reading(self):
+        """
+        Displays the reading of self.current in normal mode, resets the buttons
+        for a new word, flashes the blue dot and plays the audio.
+        """
+        jap=self.current.get('japanese',[{}])[0] # Extract Japanese word data
+        self.ids.word_label.text=jap.get('reading','...') # Display the reading
+        
+        # Enable/disable buttons based on current state.
+        self.ids.show_btn.disabled=False
+        self.ids.next_btn.disabled=True
+        self.ids.mark_btn.disabled=False
+        
+        # Show the blue dot when a new word (reading) is displayed
+        self.ids.blue_dot.opacity = 1
+        # Schedule the blue dot to disappear after BLUE_DOT_DISPLAY_DURATION
+        Clock.schedule_once(self._hide_blue_dot, BLUE_DOT_DISPLAY_DURATION)
+
+        # Remember the word so it isn't picked again soon, in this session or the next ones
+        self._seen.add(word_key(self.current))
+        self._shown_since_save += 1
+        if self._shown_since_save >= SEEN_FILTER_SAVE_EVERY:
+            self._shown_since_save = 0
+            # Written in the background; the save on exit waits for it to finish
+            threading.Thread(target=self._seen.save, daemon=True).start()
+
+        # Automatically play TTS audio for the new word
+        self.play_current_audio()
+
+    def _activate_font_subset(self, job, path, chars):
+        """
+        Uses a font subset built for the words of a load job. Runs on the main thread.
+        Subsets for superseded loads are dropped.
+        """
+        if not self._loader.is_current(job):
+            print(f"Dropping font subset from superseded load (generation {job.generation}).")
+            return
+        self._register_font_subset(path, chars)
+        self._refresh_font_names()
+        self.ids.rev_panel.populate() # Revision rows pick their font when they are built
+        # Re-render the buffered words with the subset
+        for entry in list(self.buffer):
+            self._prerender_entry(entry)
+
+    def _register_font_subset(self, path, chars):
+        """
+        Registers a font subset with Kivy and makes font_for_text use it for the texts it covers.
+        """
+        font_name = f"{FULL_FONT_NAME}-{subset_key(chars)}"
+        LabelBase.register(name=font_name, fn_regular=path)
+        activate_subset(font_name, chars)
+        print(f"Using font subset {font_name} ({len(chars)} characters).")
+
+    def _refresh_font_names(self):
+        """
+        Picks the font of the word label and the search box for their current text.
+        """
+        word_label = self.ids.word_label
+        word_label.font_name = font_for_text(word_label.text)
+        search_input = self.ids.search_input
+        search_input.font_name = font_for_text(search_input.text or search_input.hint_text)
+
+    def _prerender_entry(self, entry):
+        """
+        Pre-renders the reading and kanji textures of a buffered word. Runs on the main thread.
+        """
+        jap = entry.get('japanese', [{}])[0]
+        self.ids.word_label.prerender(jap.get('reading', ''))
+        self.ids.word_label.prerender(jap.get('word', ''))
+
+    def _rebuild_revision_index(self):
+        """
+        Indexes the revisions for the search box in a worker thread. Used after bulk changes
+        (loading, imports, merges); single marks and removals patch the index instead.
+        """
+        self._revision_index_version += 1
+        version = self._revision_index_version
+        snapshot = list(self.revisions)
+
+        def worker():
+            start = time.perf_counter()
+            search_index = PrefixIndex.from_revisions(snapshot)
+            print(f"Indexed {len(snapshot)} revisions in {(time.perf_counter() - start) * 1000:.0f} ms.")
+            self.ui.call(self._publish_revision_index, version, search_index)
+
+        threading.Thread(target=worker, daemon=True).start()
+
+    def _publish_revision_index(self, version, search_index):
+        """
+        Makes a rebuilt revision index active, unless a newer rebuild was started meanwhile.
+        Runs on the main thread. Refreshes the search results if something is typed.
+        """
+        if version != self._revision_index_version:
+            return
+        self._revision_search_index = search_index
+        self._revision_index_published = version
+        if self.ids.search_input.text:
+            self.on_search_text(self.ids.search_input.text)
+
+    def _patch_revision_index(self, entry, removed=False):
+        """
+        Adds a marked revision to the search index, or removes a deleted one.
+        """
+        if self._revision_search_index is not None:
+            if removed:
+                self._revision_search_index.remove(entry.get('reading', ''), entry.get('word', ''))
+            else:
+                self._revision_search_index.add(entry.get('reading', ''), entry.get('word', ''))
+        if self._revision_index_version != self._revision_index_published:
+            self._rebuild_revision_index() # The rebuild in progress started before this change
+
+    def on_search_text(self, text):
+        """
+        Called on every keystroke in the search box. Shows the words from the revisions
+        and the active source whose reading or kanji starts with the typed text.
+        """
+        self.ids.search_input.font_name = font_for_text(text or self.ids.search_input.hint_text)
+        revision_index = self._revision_search_index # Until it is first built, only the source is searched
+        results = revision_index.search(text, SEARCH_MAX_RESULTS) if revision_index is not None else []
+        source_index = self._source_search_index # May still be building in the loader thread
+        if source_index and len(results) < SEARCH_MAX_RESULTS:
+            for pair in source_index.search(text, SEARCH_MAX_RESULTS):
+                if pair not in results:
+                    results.append(pair)
+                    if len(results) == SEARCH_MAX_RESULTS:
+                        break
+        self._show_search_results(results)
+
+    def _show_search_results(self, results):
+        """
+        Replaces the search result list with buttons for the given (reading, word) pairs.
+        """
+        results_box = self.ids.search_results
+        results_box.clear_widgets()
+        for reading, word in results:
+            btn = Button(
+                text=f'{reading}  {word}' if word else reading,
+                font_name=font_for_text(reading + word),
+                size_hint_y=None,
+                height=dp(30),
+                halign='left',
+                valign='middle',
+                padding=(dp(5), 0),
+                background_normal='',
+                background_color=(.23, .25, .27, 1)
+            )
+            btn.bind(size=lambda instance, value: setattr(instance, 'text_size', value))
+            btn.bind(on_release=lambda inst, rd=reading, w=word: self.jump_to_word(rd, w))
+            results_box.add_widget(btn)
+
+    def jump_to_word(self, reading, word):
+        """
+        Displays a word picked from the search results as the current word (normal mode only)
+        and clears the search box.
+        """
+        self.ids.search_input.text = '' # Also clears the results through on_search_text
+        self.ids.search_input.focus = False
+        if self.in_revision_mode: return # Cannot jump in revision mode
+        self.current = {'japanese': [{'reading': reading, 'word': word}]}
+        self._display_current_reading()
 
-    @mainthread
     def _hide_blue_dot(self, dt):
         """
         Hides the blue dot. This method is scheduled by Clock.schedule_once.
@@ -704,11 +1165,127 @@ class MainLayout(BoxLayout):
 
         j=self.current.get('japanese',[{}])[0]
         entry={'reading':j.get('reading',''),'word':j.get('word','')}
-        if entry not in self.revisions: # Avoid duplicate entries
+        key=(entry['reading'],entry['word'])
+        if key not in self._revision_keys: # Avoid duplicate entries
+            self._revision_keys.add(key)
             self.revisions.append(entry) # Add to revisions list
+            self._patch_revision_index(entry)
             self.save_revisions() # Save revisions to file
         self.ids.mark_btn.disabled=True # Disable "Mark" button after marking
 
+    def open_revision_file_popup(self, mode):
+        """
+        Opens a popup asking for the file to import revisions from ('import' mode)
+        or to export them to ('export' mode).
+        """
+        path_input = TextInput(text=self._revision_file_path, multiline=False, size_hint_y=None, height=dp(30))
+        action_btn = Button(text='Import' if mode == 'import' else 'Export', size_hint_y=None, height=dp(40),
+                            background_normal='', background_color=(.2, .42, .89, 1))
+        cancel_btn = Button(text='Cancel', size_hint_y=None, height=dp(40),
+                            background_normal='', background_color=(.23, .25, .27, 1))
+        buttons = BoxLayout(size_hint_y=None, height=dp(40), spacing=dp(10))
+        buttons.add_widget(action_btn)
+        buttons.add_widget(cancel_btn)
+        message = Label(text='CSV, TSV or Anki text file:', size_hint_y=None, height=dp(30), shorten=True)
+        message.bind(width=lambda label, width: setattr(label, 'text_size', (width, None)))
+        content = BoxLayout(orientation='vertical', spacing=dp(10), padding=dp(10))
+        content.add_widget(message)
+        content.add_widget(path_input)
+        content.add_widget(buttons)
+        popup = Popup(title='Import revisions' if mode == 'import' else 'Export revisions',
+                      content=content, size_hint=(None, None), size=(dp(500), dp(220)))
+
+        def finished(error):
+            # The popup stays open until the file has been read or written, to show any error
+            if error is None:
+                popup.dismiss()
+                return
+            message.text = error
+            message.color = (1, .4, .4, 1)
+            action_btn.disabled = False
+
+        def run(*args):
+            self._revision_file_path = path_input.text.strip()
+            action_btn.disabled = True
+            message.color = (1, 1, 1, 1)
+            if mode == 'import':
+                message.text = 'Importing...'
+                self.import_revisions_file(self._revision_file_path, finished)
+            else:
+                message.text = 'Exporting...'
+                self.export_revisions_file(self._revision_file_path, finished)
+
+        action_btn.bind(on_release=run)
+        cancel_btn.bind(on_release=popup.dismiss)
+        popup.open()
+
+    def import_revisions_file(self, path, on_done=None):
+        """
+        Imports revisions from a file in a worker thread. Entries already in the list are skipped,
+        and the revision list is refreshed and saved once at the end.
+        on_done(error) is then called on the main thread, with None or an error message.
+        Without on_done, errors are shown with display_error_message.
+        """
+        existing = list(self.revisions) # Snapshot for the worker thread
+
+        def worker():
+            try:
+                start = time.perf_counter()
+                new_entries = import_revisions(path, existing)
+                print(f"Read {len(new_entries)} new revisions from {path} in {time.perf_counter() - start:.2f}s.")
+                self.ui.call(self._add_imported_revisions, new_entries)
+                error = None
+            except Exception as e:
+                print(f"Error importing revisions from {path}: {e}")
+                error = f"Could not import revisions: {e}"
+            self._report_file_result(error, on_done)
+
+        threading.Thread(target=worker, daemon=True).start()
+
+    def _add_imported_revisions(self, new_entries):
+        """
+        Adds imported entries to the revisions with a single list update. Runs on the main thread.
+        """
+        # Check again, in case words were marked while the file was being read
+        new_entries = [e for e in new_entries if (e['reading'], e['word']) not in self._revision_keys]
+        if not new_entries:
+            return
+        self._revision_keys.update((e['reading'], e['word']) for e in new_entries)
+        self.revisions = self.revisions + new_entries # One assignment, so the panel is refreshed once
+        self._rebuild_revision_index()
+        self.save_revisions()
+        print(f"Imported {len(new_entries)} revisions.")
+
+    def export_revisions_file(self, path, on_done=None):
+        """
+        Exports the revisions to a file in a worker thread.
+        on_done(error) is then called on the main thread, with None or an error message.
+        Without on_done, errors are shown with display_error_message.
+        """
+        revisions = list(self.revisions) # Snapshot for the worker thread
+
+        def worker():
+            try:
+                count = export_revisions(path, revisions)
+                print(f"Exported {count} revisions to {path}.")
+                error = None
+            except Exception as e:
+                print(f"Error exporting revisions to {path}: {e}")
+                error = f"Could not export revisions: {e}"
+            self._report_file_result(error, on_done)
+
+        threading.Thread(target=worker, daemon=True).start()
+
+    def _report_file_result(self, error, on_done):
+        """
+        Passes the result of an import or export to on_done on the main thread.
+        Without on_done, an error is shown on the word label. Can be called from any thread.
+        """
+        if on_done is not None:
+            self.ui.call(on_done, error)
+        elif error is not None:
+            self.display_error_message(error)
+
     def toggle_review(self):
         """
         Toggles the visibility and width of the revision panel.
@@ -734,9 +1311,10 @@ class MainLayout(BoxLayout):
         """
         Callback function to remove a specific entry from the revisions list.
         """
-        self.revisions=[e for e in self.revisions if e!=entry] # Filter out the removed entry
+        self.revisions=[e for e in self.revisions if e!=entry] # Filter out the removed entry (also repopulates the revision list UI)
+        self._revision_keys.discard((entry.get('reading',''),entry.get('word','')))
+        self._patch_revision_index(entry, removed=True)
         self.save_revisions() # Save updated revisions
-        self.ids.rev_panel.populate() # Repopulate the revision list UI
         # If the revision queue is affected, update it
         if self.in_revision_mode:
             self.revision_queue = [e for e in self.revision_queue if e!=entry]
@@ -789,6 +1367,11 @@ class MainLayout(BoxLayout):
 
             # Automatically play TTS audio for the revision word
             self.play_current_audio()
+
+            # Pre-render the kanji of this word and the next word of the session
+            self.ui.call(self._prerender_entry, self.current)
+            if self.revision_index + 1 < len(self.revision_queue):
+                self.ui.call(self._prerender_entry, {'japanese': [self.revision_queue[self.revision_index + 1]]})
         else:
             # End of revision session
             setattr(self.ids.word_label, 'text', "Revision Session Complete!")
@@ -816,15 +1399,21 @@ class MainLayout(BoxLayout):
         
         self.try_next() # Get a new random word for normal mode
 
-    @mainthread
     def display_error_message(self, message):
         """
         Displays an error message on the main word label and disables buttons.
+        Can be called from any thread.
         """
-        setattr(self.ids.word_label, 'text', message)
-        Clock.schedule_once(lambda dt: setattr(self.ids.show_btn, 'disabled', True), 0.1)
-        Clock.schedule_once(lambda dt: setattr(self.ids.next_btn, 'disabled', True), 0.1)
-        Clock.schedule_once(lambda dt: setattr(self.ids.mark_btn, 'disabled', True), 0.1)
+        self.ui.set(self.ids.word_label, text=message)
+        self._disable_word_buttons()
+
+    def _disable_word_buttons(self):
+        """
+        Queues disabling the show, next and mark buttons. Can be called from any thread.
+        """
+        self.ui.set(self.ids.show_btn, disabled=True)
+        self.ui.set(self.ids.next_btn, disabled=True)
+        self.ui.set(self.ids.mark_btn, disabled=True)
 
 
 class RandomJapaneseApp(App):
@@ -838,6 +1427,12 @@ class RandomJapaneseApp(App):
         Window.clearcolor=(0.082,0.082,0.098,1) # Set window background color
         return MainLayout() # Return the main layout as the root widget
 
+    def on_stop(self):
+        """
+        Saves the recently shown words when the application closes.
+        """
+        self.root._seen.save()
+
 if __name__=='__main__':
     # Set the window size here, before the app runs
     Window.size = (1280, 720) # Example: 1280 pixels wide, 720 pixels high
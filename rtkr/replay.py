@@ -0,0 +1,413 @@
+# rtkr/replay.py - Scripted session replay harness
+#
+# Drives the real MainLayout with a recorded or generated keystroke script and reports
+# keypress-to-display latency, keypress-to-audio latency and buffer underruns.
+# TTS is replaced by a local stub, and revisions are written to a temporary copy.
+#
+# Usage (from the parent directory of the rtkr package):
+#   python -m rtkr.replay [--script FILE] [--actions N] [--rate KEYS_PER_SECOND]
+#                         [--tts-latency MS] [--profile FILE] [--seed N]
+#                         [--source NAME] [--legacy-ui] [--no-prerender]
+#
+# A window is still created (hidden), so headless machines need a virtual display,
+# e.g. 'xvfb-run python -m rtkr.replay'.
+#
+# Script files contain one action per line ('#' starts a comment):
+#   space            show the kanji, or go to the next word (like the spacebar)
+#   show / next      press the show or next button
+#   audio            replay the audio (like the 'A' key)
+#   mark             mark the current word for revision
+#   revision_start   start a revision session
+#   revision_end     end the revision session
+#   source NAME      switch the word source (JMdict, JLPT1 ... JLPT5)
+#   wait SECONDS     pause the script
+
+import time
+STARTED = time.perf_counter() # Before Kivy and the app are imported, for the startup time
+
+import argparse
+import cProfile
+import io
+import json
+import os
+import pstats
+import random
+import shutil
+import sys
+import resource
+import tempfile
+import wave
+
+os.environ.setdefault('KIVY_NO_ARGS', '1') # Keep Kivy from parsing our command line options
+os.environ.setdefault('KIVY_NO_CONSOLELOG', '1')
+
+from kivy.config import Config
+Config.set('graphics', 'window_state', 'hidden')
+
+from kivy.clock import Clock
+from kivy.core.window import Window
+
+from . import fonts, main
+from .config import JLPT_LEVELS
+from .sources import available_sources
+from .utils import percentile
+
+SPACE_KEY = 32
+AUDIO_KEY = 97
+SOURCE_SWITCH_TIMEOUT = 120 # Seconds to wait for a source to load before giving up
+
+class StubTTS:
+    """
+    Stand-in for gTTS that writes a short silent WAV file instead of calling the network.
+    The optional latency simulates the time a real TTS request blocks for.
+    """
+    latency = 0.0 # Seconds
+
+    def __init__(self, text, lang='ja'):
+        self.text = text
+        self.lang = lang
+
+    def save(self, path):
+        if StubTTS.latency:
+            time.sleep(StubTTS.latency)
+        with wave.open(path, 'wb') as f:
+            f.setnchannels(1)
+            f.setsampwidth(2)
+            f.setframerate(8000)
+            f.writeframes(b'\x00\x00' * 800) # 0.1 s of silence
+
+class StubSound:
+    """
+    Stand-in for a Kivy Sound that only reports when playback starts.
+    """
+    length = 0.1
+
+    def __init__(self, on_play):
+        self._on_play = on_play
+
+    def play(self):
+        self._on_play()
+
+    def stop(self):
+        pass
+
+class StubSoundLoader:
+    """
+    Stand-in for Kivy's SoundLoader returning StubSound objects.
+    """
+    on_play = None
+
+    @classmethod
+    def load(cls, path):
+        return StubSound(cls.on_play)
+
+def current_rss():
+    """
+    Returns the resident memory of the process in bytes (Linux), or None if unknown.
+    """
+    try:
+        with open('/proc/self/status', 'r') as f:
+            for line in f:
+                if line.startswith('VmRSS:'):
+                    return int(line.split()[1]) * 1024
+    except OSError:
+        pass
+    return None
+
+def generate_script(count, seed=None):
+    """
+    Generates a script that mostly shows and skips words, with occasional audio replays,
+    marks, one revision session and one source switch.
+    """
+    rng = random.Random(seed)
+    actions = []
+    for i in range(count):
+        roll = rng.random()
+        if roll < 0.05:
+            actions.append('audio')
+        elif roll < 0.10:
+            actions.append('mark')
+        else:
+            actions.append('space')
+        if i == count // 2:
+            actions += ['revision_start'] + ['space'] * 10 + ['revision_end']
+        if i == (3 * count) // 4:
+            actions.append(f'source JLPT{rng.choice(JLPT_LEVELS)}')
+    return actions
+
+def load_script(path):
+    """
+    Reads a script file, one action per line.
+    """
+    actions = []
+    with open(path, 'r', encoding='utf-8') as f:
+        for line in f:
+            line = line.split('#', 1)[0].strip()
+            if line:
+                actions.append(line)
+    return actions
+
+class ReplayDriver:
+    """
+    Plays a script against a MainLayout at a fixed rate and records latencies.
+    """
+
+    def __init__(self, layout, actions, rate, profiler=None):
+        self.layout = layout
+        self.actions = list(actions)
+        self.interval = 1.0 / rate
+        self.profiler = profiler
+
+        self.display_latencies = [] # Seconds from keypress to the new text's texture being set
+        self.audio_latencies = [] # Seconds from keypress to audio playback starting
+        self.source_switch_times = [] # Seconds from a source switch to its first word on screen
+        self.first_frame = None # (seconds since start, resident memory) when the first frame was drawn
+        self.underruns = 0 # 'next' presses with an empty buffer
+        self.incomplete = 0 # Presses whose display or audio never happened before the next action
+        self._pending = None # [start time, expects display, expects audio]
+        self._resume_at = 0 # Script paused until this time (used by 'wait')
+        self._switching_since = None # Start of the source switch we are waiting for
+        self._index = 0
+        self.finished = False
+
+        layout.ids.word_label.bind(texture=self._on_texture)
+        StubSoundLoader.on_play = self._on_audio
+        Window.bind(on_flip=self._on_first_flip)
+
+    def _on_first_flip(self, *args):
+        Window.unbind(on_flip=self._on_first_flip)
+        self.first_frame = (time.perf_counter() - STARTED, current_rss())
+
+    def start(self):
+        # Wait for the first word before starting the clock
+        self._switching_since = time.perf_counter()
+        self._event = Clock.schedule_interval(self._step, self.interval)
+
+    def _on_texture(self, *args):
+        if self._pending and self._pending[1] is True:
+            self._pending[1] = time.perf_counter()
+            self._check_pending()
+
+    def _on_audio(self):
+        if self._pending and self._pending[2] is True:
+            self._pending[2] = time.perf_counter()
+            self._check_pending()
+
+    def _check_pending(self):
+        start, display, audio = self._pending
+        if display is True or audio is True:
+            return # Still waiting for something
+        if display:
+            self.display_latencies.append(display - start)
+        if audio:
+            self.audio_latencies.append(audio - start)
+        self._pending = None
+
+    def _begin(self, expects_display, expects_audio):
+        if self._pending:
+            self.incomplete += 1
+        self._pending = [time.perf_counter(), expects_display or None, expects_audio or None]
+
+    def _word_ready(self):
+        return not self.layout.ids.show_btn.disabled or not self.layout.ids.next_btn.disabled
+
+    def _step(self, dt):
+        now = time.perf_counter()
+        if self._switching_since is not None:
+            if self._word_ready():
+                self.source_switch_times.append(now - self._switching_since)
+                self._switching_since = None
+                if self.profiler and self._index == 0:
+                    self.profiler.enable()
+            elif now - self._switching_since > SOURCE_SWITCH_TIMEOUT:
+                print("replay: timed out waiting for words to load.")
+                self._finish()
+            return
+        if now < self._resume_at:
+            return
+        if self._index >= len(self.actions):
+            self._finish()
+            return
+
+        action = self.actions[self._index]
+        self._index += 1
+        self._run_action(action)
+
+    def _run_action(self, action):
+        layout = self.layout
+        name, _, argument = action.partition(' ')
+        if name == 'space':
+            if not layout.ids.show_btn.disabled:
+                self._begin(True, False)
+            elif not layout.ids.next_btn.disabled:
+                self._begin_next()
+            layout._on_keyboard_down(Window, SPACE_KEY, 0, ' ', [])
+        elif name == 'show':
+            self._begin(True, False)
+            layout.show_word()
+        elif name == 'next':
+            self._begin_next()
+            layout.next_word()
+        elif name == 'audio':
+            self._begin(False, True)
+            layout._on_keyboard_down(Window, AUDIO_KEY, 0, 'a', [])
+        elif name == 'mark':
+            layout.mark_current()
+        elif name == 'revision_start':
+            if layout.revisions:
+                self._begin(True, True)
+                layout.start_revision_session()
+        elif name == 'revision_end':
+            if layout.in_revision_mode:
+                layout.end_revision_session()
+        elif name == 'source':
+            self._pending = None
+            layout.set_source(argument.strip())
+            layout._disable_word_buttons() # So the old word doesn't count as the new source being ready
+            if layout.source_panel_visible:
+                layout.toggle_source_panel()
+            self._switching_since = time.perf_counter()
+        elif name == 'wait':
+            self._resume_at = time.perf_counter() + float(argument)
+        else:
+            print(f"replay: unknown action '{action}', skipped.")
+
+    def _begin_next(self):
+        if not self.layout.in_revision_mode and not self.layout.buffer:
+            self.underruns += 1
+        self._begin(True, True)
+
+    def _finish(self):
+        if self.finished:
+            return
+        self.finished = True
+        self._event.cancel()
+        if self.profiler:
+            self.profiler.disable()
+        main.App.get_running_app().stop()
+
+    def report(self):
+        """
+        Returns the results as printable text.
+        """
+        def fmt(values):
+            if not values:
+                return "n/a"
+            return (f"p50 {percentile(values, 50) * 1000:.1f} ms, p95 {percentile(values, 95) * 1000:.1f} ms, "
+                    f"p99 {percentile(values, 99) * 1000:.1f} ms (n={len(values)})")
+
+        ui = self.layout.ui
+        elapsed = time.monotonic() - ui.created
+        update_times = self.layout.ids.word_label.update_times
+        cached = [seconds for source, seconds in update_times if source == 'cached']
+        rendered = [seconds for source, seconds in update_times if source == 'rendered']
+        startup = "n/a"
+        if self.first_frame:
+            seconds, rss = self.first_frame
+            startup = f"{seconds * 1000:.0f} ms" + (f", {rss / (1024 * 1024):.1f} MB resident" if rss else "")
+        peak_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024 # KB on Linux
+        return "\n".join([
+            f"Startup to first frame: {startup} (peak resident memory {peak_rss:.1f} MB)",
+            f"Actions played: {self._index}/{len(self.actions)}",
+            f"Keypress to display: {fmt(self.display_latencies)}",
+            f"Keypress to audio: {fmt(self.audio_latencies)}",
+            f"Source load to first word: {fmt(self.source_switch_times)}",
+            f"Buffer underruns: {self.underruns}",
+            f"Incomplete presses: {self.incomplete}",
+            f"Word label texture updates: cached {fmt(cached)}, rendered {fmt(rendered)} "
+            f"({'pre-rendering' if main.PRERENDER_WORD_TEXTURES else 'no pre-rendering'})",
+            f"UI wakeups from the app: {ui.total_wakeups / elapsed:.2f}/s, {ui.total_updates / elapsed:.2f} updates/s "
+            f"over {elapsed:.1f}s ({'batched' if ui.batched else 'unbatched, with buffer polling'})",
+        ])
+
+class ReplayApp(main.RandomJapaneseApp):
+    """
+    The normal app with a replay driver attached once the window is up.
+    """
+
+    def __init__(self, actions, rate, profiler=None, **kwargs):
+        super().__init__(**kwargs)
+        self._actions = actions
+        self._rate = rate
+        self._profiler = profiler
+        self.driver = None
+
+    def on_start(self):
+        self.driver = ReplayDriver(self.root, self._actions, self._rate, self._profiler)
+        self.driver.start()
+
+def run(actions, rate, tts_latency=0.0, profile_path=None, source=None, legacy_ui=False, prerender=True):
+    """
+    Replays the actions and prints the report (and the profile summary if requested).
+    'source' overrides the saved word source, legacy_ui turns off UI_BATCH_UPDATES
+    and prerender=False turns off PRERENDER_WORD_TEXTURES.
+    """
+    # Stub out TTS and audio, and keep the user's revisions, seen words and caches safe
+    StubTTS.latency = tts_latency
+    main.gTTS = StubTTS
+    main.SoundLoader = StubSoundLoader
+    temp_dir = tempfile.mkdtemp(prefix='rtkr-replay-')
+    temp_revisions = os.path.join(temp_dir, 'revisions.json')
+    if os.path.exists(main.REVISIONS_FILE):
+        shutil.copy(main.REVISIONS_FILE, temp_revisions)
+    if source:
+        data = {'revisions': [], 'current_source': source}
+        if os.path.exists(temp_revisions):
+            with open(temp_revisions, 'r', encoding='utf-8') as f:
+                saved = json.load(f)
+            data['revisions'] = saved.get('revisions', []) if isinstance(saved, dict) else saved
+        with open(temp_revisions, 'w', encoding='utf-8') as f:
+            json.dump(data, f, ensure_ascii=False)
+    main.REVISIONS_FILE = temp_revisions
+    main.UI_BATCH_UPDATES = not legacy_ui
+    main.PRERENDER_WORD_TEXTURES = prerender
+    main.PRERENDER_TIMING = True # Collect the texture update times for the report
+    main.SEEN_FILTER_FILE = os.path.join(temp_dir, 'seen_words.bin') # Start without recently seen words
+    # Work on copies of the JMdict cache and the font subsets, so startup still finds them
+    for word_source in available_sources():
+        store = getattr(word_source, 'store', None)
+        if store is not None:
+            temp_cache = os.path.join(temp_dir, os.path.basename(store.cache_path))
+            if os.path.exists(store.cache_path):
+                shutil.copy(store.cache_path, temp_cache)
+            store.cache_path = temp_cache
+    temp_subsets = os.path.join(temp_dir, 'font_subsets')
+    if os.path.isdir(fonts.FONT_SUBSET_DIR):
+        shutil.copytree(fonts.FONT_SUBSET_DIR, temp_subsets)
+    fonts.FONT_SUBSET_DIR = temp_subsets
+    fonts.SUBSET_INDEX_FILE = os.path.join(temp_subsets, os.path.basename(fonts.SUBSET_INDEX_FILE))
+
+    profiler = cProfile.Profile() if profile_path else None
+    app = ReplayApp(actions, rate, profiler)
+    try:
+        app.run()
+    finally:
+        shutil.rmtree(temp_dir, ignore_errors=True)
+
+    print(app.driver.report() if app.driver else "replay: the app did not start.")
+    if profiler:
+        profiler.dump_stats(profile_path)
+        summary = io.StringIO()
+        pstats.Stats(profiler, stream=summary).sort_stats('cumulative').print_stats(20)
+        print(f"Profile saved to {profile_path}. Top functions by cumulative time:")
+        print(summary.getvalue())
+
+def parse_args(argv):
+    parser = argparse.ArgumentParser(description="Replay a scripted session and report latencies.")
+    parser.add_argument('--script', help="Script file with one action per line (default: generated)")
+    parser.add_argument('--actions', type=int, default=200, help="Number of generated actions")
+    parser.add_argument('--seed', type=int, default=None, help="Seed for the generated script")
+    parser.add_argument('--rate', type=float, default=5.0, help="Actions per second")
+    parser.add_argument('--tts-latency', type=float, default=0.0, help="Simulated TTS latency in ms")
+    parser.add_argument('--profile', help="Write a cProfile of the replay to this file")
+    parser.add_argument('--source', help="Word source to start with (default: the saved one)")
+    parser.add_argument('--legacy-ui', action='store_true',
+                        help="Use the old unbatched UI updates and buffer polling, to compare wakeups")
+    parser.add_argument('--no-prerender', action='store_true',
+                        help="Render word textures when they are displayed, to compare with pre-rendering")
+    return parser.parse_args(argv)
+
+if __name__ == '__main__':
+    args = parse_args(sys.argv[1:])
+    script = load_script(args.script) if args.script else generate_script(args.actions, args.seed)
+    run(script, args.rate, args.tts_latency / 1000.0, args.profile, args.source, args.legacy_ui, not args.no_prerender)
@@ -0,0 +1,170 @@
+# rtkr/revisions_io.py
+
+import csv
+import json
+import os
+import re
+
+# Header names recognized for the reading and kanji columns (lowercase)
+READING_HEADERS = {'reading', 'kana', 'yomi', 'furigana', 'hiragana'}
+WORD_HEADERS = {'word', 'kanji', 'expression', 'vocab', 'japanese', 'front'}
+
+# Anki text exports may contain HTML markup and start with '#key:value' header lines
+HTML_TAG_PATTERN = re.compile(r'<[^>]+>')
+ANKI_HEADER_PATTERN = re.compile(r'^#\w+:')
+
+def _is_kana(text):
+    """
+    Checks if a string only contains Hiragana, Katakana and the prolonged sound mark.
+    """
+    return bool(text) and all('぀' <= char <= 'ヿ' for char in text)
+
+def _clean_field(text):
+    """
+    Strips HTML tags, non-breaking spaces and surrounding whitespace from a field.
+    """
+    return HTML_TAG_PATTERN.sub('', text).replace('&nbsp;', ' ').strip()
+
+def _sniff_delimiter(sample):
+    """
+    Guesses the field delimiter of a CSV/TSV/Anki text sample.
+    """
+    if '#separator:tab' in sample.lower():
+        return '\t'
+    try:
+        return csv.Sniffer().sniff(sample, delimiters=',\t;').delimiter
+    except csv.Error:
+        return '\t' if sample.count('\t') >= sample.count(',') else ','
+
+def iter_import_rows(path):
+    """
+    Streams (reading, word) pairs from a CSV, TSV or Anki text export file.
+    Lines are read one at a time, so memory use doesn't depend on the file size.
+
+    A header row naming the reading and word columns (e.g. 'expression,reading' like the
+    JLPT lists) is used if present. Otherwise the first two columns are used, and the one
+    written only in kana is taken as the reading.
+    """
+    with open(path, 'r', encoding='utf-8-sig', newline='') as f:
+        sample = f.read(64 * 1024)
+        f.seek(0)
+        delimiter = _sniff_delimiter(sample)
+
+        # Skip Anki '#separator:tab' style header lines
+        lines = (line for line in f if not ANKI_HEADER_PATTERN.match(line))
+        reader = csv.reader(lines, delimiter=delimiter)
+
+        reading_col = word_col = None
+        for row in reader:
+            fields = [_clean_field(field) for field in row]
+            if len(fields) < 2:
+                continue
+
+            if reading_col is None and word_col is None:
+                names = [field.lower() for field in fields]
+                reading_col = next((i for i, name in enumerate(names) if name in READING_HEADERS), None)
+                word_col = next((i for i, name in enumerate(names) if name in WORD_HEADERS), None)
+                if reading_col is not None or word_col is not None:
+                    # This row is the header. Use the first other column for a missing one.
+                    if reading_col is None:
+                        reading_col = 0 if word_col != 0 else 1
+                    if word_col is None:
+                        word_col = 0 if reading_col != 0 else 1
+                    continue
+                reading_col = word_col = -1 # No header, guess per row
+
+            if reading_col >= 0:
+                if max(reading_col, word_col) >= len(fields):
+                    continue
+                reading, word = fields[reading_col], fields[word_col]
+            elif _is_kana(fields[0]) and not _is_kana(fields[1]):
+                reading, word = fields[0], fields[1]
+            else:
+                word, reading = fields[0], fields[1]
+
+            if reading or word:
+                yield reading, word
+
+def revision_key(entry):
+    """
+    Returns the (reading, word) pair identifying a revision entry.
+    """
+    return (entry.get('reading', ''), entry.get('word', ''))
+
+def read_revisions_file(path):
+    """
+    Returns the content of a revisions file (REVISIONS_FILE) as a dict,
+    {'revisions': [...], 'current_source': ...}. The old format (a plain list) is converted,
+    and a missing file gives an empty list. Raises an exception if the file can't be read.
+    """
+    if not os.path.exists(path):
+        return {'revisions': []}
+    with open(path, 'r', encoding='utf-8') as f:
+        data = json.load(f)
+    if isinstance(data, list):
+        return {'revisions': data}
+    if not isinstance(data, dict):
+        raise ValueError("unexpected format")
+    return data
+
+def save_revisions_file(path, added, removed_keys, **fields):
+    """
+    Applies changes to a revisions file that other processes (the app, the drill server) may
+    have changed since it was read: the file is read again, entries whose key is in removed_keys
+    are dropped, the 'added' entries it doesn't have yet are appended, and the given fields
+    (e.g. current_source) are set. Everything else in the file is kept. The file is replaced
+    atomically. Returns the revisions now in the file. Raises an exception if the file can't be
+    read or written; an unreadable file is left as it is.
+    """
+    data = read_revisions_file(path)
+    revisions = [entry for entry in data.get('revisions', []) if revision_key(entry) not in removed_keys]
+    keys = {revision_key(entry) for entry in revisions}
+    for entry in added:
+        if revision_key(entry) not in keys:
+            keys.add(revision_key(entry))
+            revisions.append(entry)
+    data['revisions'] = revisions
+    data.update(fields)
+    revisions_dir = os.path.dirname(path)
+    if revisions_dir and not os.path.exists(revisions_dir):
+        os.makedirs(revisions_dir)
+    part_path = path + '.part'
+    with open(part_path, 'w', encoding='utf-8') as f:
+        json.dump(data, f, ensure_ascii=False, indent=2)
+    os.replace(part_path, path)
+    return revisions
+
+def import_revisions(path, existing):
+    """
+    Reads new revision entries from a file, skipping rows already in 'existing'
+    (a list of {'reading': ..., 'word': ...} entries) and duplicates within the file.
+    Returns the list of new entries.
+    """
+    seen = {(entry.get('reading', ''), entry.get('word', '')) for entry in existing}
+    new_entries = []
+    for reading, word in iter_import_rows(path):
+        key = (reading, word)
+        if key not in seen:
+            seen.add(key)
+            new_entries.append({'reading': reading, 'word': word})
+    return new_entries
+
+def export_revisions(path, revisions):
+    """
+    Writes revision entries to a file, one row at a time. Files ending in '.csv' are written
+    as CSV with a 'word,reading' header. Anything else is written as a tab separated Anki
+    text export (word in the first field, reading in the second).
+    Returns the number of rows written.
+    """
+    count = 0
+    with open(path, 'w', encoding='utf-8', newline='') as f:
+        if path.lower().endswith('.csv'):
+            writer = csv.writer(f)
+            writer.writerow(['word', 'reading'])
+        else:
+            f.write('#separator:tab\n#html:false\n')
+            writer = csv.writer(f, delimiter='\t', lineterminator='\n')
+        for entry in revisions:
+            writer.writerow([entry.get('word', ''), entry.get('reading', '')])
+            count += 1
+    return count
@@ -0,0 +1,161 @@
+# rtkr/search.py
+
+from bisect import bisect_left, bisect_right
+
+# Translation table mapping Katakana (ァ to ヶ) to the matching Hiragana
+KATAKANA_TO_HIRAGANA = {code: code - (ord('ァ') - ord('ぁ')) for code in range(ord('ァ'), ord('ヶ') + 1)}
+
+def normalize_search_key(text):
+    """
+    Normalizes text for prefix matching: strips whitespace and converts Katakana to Hiragana,
+    so that searching for トウ also finds readings written as とう.
+    """
+    return text.strip().translate(KATAKANA_TO_HIRAGANA)
+
+class PrefixIndex:
+    """
+    Sorted index over the readings and kanji of a list of words, answering
+    "which words start with this prefix" queries with a binary search.
+    Each word is indexed twice (by reading and by kanji) and results are (reading, word) pairs.
+    """
+
+    def __init__(self, pairs=()):
+        """
+        Builds the index from an iterable of (reading, word) pairs.
+        """
+        keys = []
+        values = []
+        for pair in pairs:
+            for key in pair:
+                key = normalize_search_key(key)
+                if key:
+                    keys.append(key)
+                    values.append(pair)
+        # Sort positions rather than (key, pair) tuples, so only the strings are compared.
+        # Keys are kept in their own list so bisect compares plain strings too.
+        order = sorted(range(len(keys)), key=keys.__getitem__)
+        self._keys = [keys[i] for i in order]
+        self._pairs = [values[i] for i in order]
+
+    @classmethod
+    def from_words(cls, words):
+        """
+        Builds the index from word entries in the {'japanese': [{'reading': ..., 'word': ...}]} format.
+        """
+        def pairs():
+            for item in words:
+                jap_entry = item.get('japanese', [{}])[0]
+                yield (jap_entry.get('reading', ''), jap_entry.get('word', ''))
+        return cls(pairs())
+
+    @classmethod
+    def from_revisions(cls, revisions):
+        """
+        Builds the index from revision entries in the {'reading': ..., 'word': ...} format.
+        """
+        return cls((entry.get('reading', ''), entry.get('word', '')) for entry in revisions)
+
+    def add(self, reading, word):
+        """
+        Inserts a (reading, word) pair into the index, keeping it sorted.
+        """
+        pair = (reading, word)
+        for key in pair:
+            key = normalize_search_key(key)
+            if key:
+                i = bisect_right(self._keys, key)
+                self._keys.insert(i, key)
+                self._pairs.insert(i, pair)
+
+    def remove(self, reading, word):
+        """
+        Removes a (reading, word) pair from the index, if present.
+        """
+        pair = (reading, word)
+        for key in pair:
+            key = normalize_search_key(key)
+            if not key:
+                continue
+            i = bisect_left(self._keys, key)
+            while i < len(self._keys) and self._keys[i] == key:
+                if self._pairs[i] == pair:
+                    del self._keys[i]
+                    del self._pairs[i]
+                    break
+                i += 1
+
+    def patched(self, added=(), removed=()):
+        """
+        Returns a new index with the (reading, word) pairs in 'removed' taken out and the pairs
+        in 'added' put in, leaving this one unchanged. The positions of the changes are found
+        with binary searches and the unchanged runs between them are copied as list slices,
+        so a diff costs one copy of the index instead of one list insertion or deletion per key.
+        Meant for worker threads: the result can be swapped in on the main thread.
+        """
+        keys = self._keys
+        pairs = self._pairs
+        events = [] # (position, 0 to insert before it or 1 to delete it, key, pair)
+        taken = set()
+        for pair in removed:
+            for key in pair:
+                key = normalize_search_key(key)
+                if not key:
+                    continue
+                i = bisect_left(keys, key)
+                while i < len(keys) and keys[i] == key:
+                    if pairs[i] == pair and i not in taken:
+                        taken.add(i)
+                        events.append((i, 1, key, pair))
+                        break
+                    i += 1
+        for pair in added:
+            for key in pair:
+                key = normalize_search_key(key)
+                if key:
+                    # New keys go after existing equal keys, like add() does
+                    events.append((bisect_right(keys, key), 0, key, pair))
+        events.sort(key=lambda event: (event[0], event[1], event[2]))
+
+        new_keys = []
+        new_pairs = []
+        start = 0
+        for position, delete, key, pair in events:
+            new_keys += keys[start:position]
+            new_pairs += pairs[start:position]
+            start = position
+            if delete:
+                start += 1
+            else:
+                new_keys.append(key)
+                new_pairs.append(pair)
+        new_keys += keys[start:]
+        new_pairs += pairs[start:]
+
+        index = PrefixIndex()
+        index._keys = new_keys
+        index._pairs = new_pairs
+        return index
+
+    def __len__(self):
+        return len(self._keys)
+
+    def search(self, prefix, limit):
+        """
+        Returns up to 'limit' distinct (reading, word) pairs whose reading or kanji starts
+        with the prefix, in sorted key order.
+        """
+        prefix = normalize_search_key(prefix)
+        if not prefix or limit <= 0:
+            return []
+
+        results = []
+        seen = set()
+        keys = self._keys
+        i = bisect_left(keys, prefix)
+        while i < len(keys) and keys[i].startswith(prefix) and len(results) < limit:
+            pair = self._pairs[i]
+            if pair not in seen:
+                seen.add(pair)
+                results.append(pair)
+            i += 1
+        return results
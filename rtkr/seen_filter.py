@@ -0,0 +1,201 @@
+# rtkr/seen_filter.py
+
+import hashlib
+import math
+import os
+import random
+import struct
+import threading
+import time
+
+# Import configuration settings
+from .config import (
+    SEEN_FILTER_FILE, SEEN_FILTER_CAPACITY, SEEN_FILTER_FP_RATE, SEEN_FILTER_ROTATE_DAYS,
+    SEEN_FILTER_MAX_RETRIES
+)
+
+# File layout: magic, version, then the current and previous filters,
+# each as a header (bits, hashes, count, creation time) followed by its bit array
+FILE_MAGIC = b'RTKRSEEN'
+FILE_VERSION = 1
+FILTER_HEADER = struct.Struct('<IIId')
+
+class BloomFilter:
+    """
+    Fixed-size Bloom filter over strings, sized for 'capacity' items at a false positive rate.
+    Bit positions come from one blake2b hash split in two (double hashing).
+    """
+
+    def __init__(self, capacity, fp_rate, created=None):
+        # Optimal sizes: m = -n ln(p) / ln(2)^2 bits and k = m/n ln(2) hashes
+        self.num_bits = max(8, int(math.ceil(-capacity * math.log(fp_rate) / (math.log(2) ** 2))))
+        self.num_hashes = max(1, int(round(self.num_bits / capacity * math.log(2))))
+        self.bits = bytearray((self.num_bits + 7) // 8)
+        self.count = 0 # Number of items added (duplicates included)
+        self.created = created if created is not None else time.time()
+
+    def _positions(self, key):
+        digest = hashlib.blake2b(key.encode('utf-8'), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], 'little')
+        h2 = int.from_bytes(digest[8:], 'little') | 1
+        return [(h1 + i * h2) % self.num_bits for i in range(self.num_hashes)]
+
+    def add(self, key):
+        for pos in self._positions(key):
+            self.bits[pos >> 3] |= 1 << (pos & 7)
+        self.count += 1
+
+    def __contains__(self, key):
+        bits = self.bits
+        return all(bits[pos >> 3] & (1 << (pos & 7)) for pos in self._positions(key))
+
+    def to_bytes(self):
+        return FILTER_HEADER.pack(self.num_bits, self.num_hashes, self.count, self.created) + bytes(self.bits)
+
+    @classmethod
+    def from_bytes(cls, data, offset):
+        """
+        Reads a filter written by to_bytes() at 'offset'. Returns (filter, offset after it).
+        """
+        num_bits, num_hashes, count, created = FILTER_HEADER.unpack_from(data, offset)
+        offset += FILTER_HEADER.size
+        size = (num_bits + 7) // 8
+        if offset + size > len(data):
+            raise ValueError("truncated filter")
+        bloom = cls.__new__(cls)
+        bloom.num_bits = num_bits
+        bloom.num_hashes = num_hashes
+        bloom.count = count
+        bloom.created = created
+        bloom.bits = bytearray(data[offset:offset + size])
+        return bloom, offset + size
+
+class SeenFilter:
+    """
+    Remembers recently shown words across sessions in a rotating pair of Bloom filters.
+
+    New words go into the current filter and lookups check both. When the current filter
+    is full (SEEN_FILTER_CAPACITY words) or older than SEEN_FILTER_ROTATE_DAYS, it becomes
+    the previous filter and the old previous filter is dropped, so a word is remembered for
+    one to two rotation periods. Memory is fixed by the capacity, not by the size of the source.
+    The age is also checked when the filters are loaded, so a session started after a long
+    break doesn't keep skipping the words of the last one.
+    Each filter is sized for half the configured false positive rate, so the pair stays within it.
+    """
+
+    def __init__(self, path=SEEN_FILTER_FILE, capacity=SEEN_FILTER_CAPACITY,
+                 fp_rate=SEEN_FILTER_FP_RATE, rotate_days=SEEN_FILTER_ROTATE_DAYS):
+        self.path = path
+        self.capacity = capacity
+        self.fp_rate = fp_rate
+        self.max_age = rotate_days * 24 * 3600
+        self._lock = threading.Lock() # lookups come from buffer threads, adds from the main thread
+        self._save_lock = threading.Lock() # one save at a time, so a save on exit waits for a running one
+        self._dirty = False
+        self.current = None
+        self.previous = None
+        self._load()
+        if self.current is None:
+            self.current = self._new_filter()
+        with self._lock:
+            self._rotate_if_needed()
+
+    def _new_filter(self):
+        return BloomFilter(self.capacity, self.fp_rate / 2)
+
+    def _load(self):
+        """
+        Reads the filters from self.path. A missing, unreadable or differently sized file starts empty.
+        """
+        if not os.path.exists(self.path):
+            return
+        try:
+            with open(self.path, 'rb') as f:
+                data = f.read()
+            if data[:len(FILE_MAGIC)] != FILE_MAGIC or data[len(FILE_MAGIC)] != FILE_VERSION:
+                raise ValueError("unknown file format")
+            offset = len(FILE_MAGIC) + 1
+            current, offset = BloomFilter.from_bytes(data, offset)
+            previous = None
+            if offset < len(data):
+                previous, offset = BloomFilter.from_bytes(data, offset)
+            # Filters sized for other settings are still valid, they are replaced at the next rotation
+            self.current, self.previous = current, previous
+            print(f"Loaded seen words filter ({self.current.count} recent words, {self.memory_size() / 1024:.0f} KB).")
+        except Exception as e:
+            print(f"Error reading seen words filter {self.path}: {e}. Starting a new one.")
+
+    def save(self):
+        """
+        Writes the filters to self.path atomically, if they changed since the last save.
+        Can be called from any thread.
+        """
+        with self._save_lock:
+            with self._lock:
+                if not self._dirty:
+                    return
+                data = FILE_MAGIC + bytes([FILE_VERSION]) + self.current.to_bytes()
+                if self.previous is not None:
+                    data += self.previous.to_bytes()
+                self._dirty = False
+            try:
+                data_dir = os.path.dirname(self.path)
+                if data_dir and not os.path.exists(data_dir):
+                    os.makedirs(data_dir)
+                part_path = self.path + '.part'
+                with open(part_path, 'wb') as f:
+                    f.write(data)
+                os.replace(part_path, self.path)
+            except Exception as e:
+                print(f"Error saving seen words filter {self.path}: {e}")
+                with self._lock:
+                    self._dirty = True # Try again at the next save
+
+    def _rotate_if_needed(self):
+        current = self.current
+        age = time.time() - current.created
+        if current.count >= self.capacity or age >= self.max_age:
+            print(f"Rotating seen words filter ({current.count} words).")
+            # A filter older than two periods has outlived its time as the previous filter too
+            self.previous = current if age < 2 * self.max_age else None
+            self.current = self._new_filter()
+            self._dirty = True
+
+    def add(self, key):
+        """
+        Records a word as seen.
+        """
+        with self._lock:
+            self._rotate_if_needed()
+            self.current.add(key)
+            self._dirty = True
+
+    def __contains__(self, key):
+        with self._lock:
+            return key in self.current or (self.previous is not None and key in self.previous)
+
+    def memory_size(self):
+        """
+        Returns the size of the bit arrays in bytes.
+        """
+        return len(self.current.bits) + (len(self.previous.bits) if self.previous is not None else 0)
+
+def word_key(item):
+    """
+    Returns the key a word entry is remembered by. Readings and kanji are used instead of
+    source-specific ids, so a word seen in one source also counts as seen in the others.
+    """
+    jap_entry = item.get('japanese', [{}])[0]
+    return f"{jap_entry.get('word', '')}\t{jap_entry.get('reading', '')}"
+
+def sample_unseen(words, seen, max_retries=SEEN_FILTER_MAX_RETRIES):
+    """
+    Picks a random word entry, drawing again while it is in 'seen' (a SeenFilter).
+    After max_retries redraws the last pick is kept, so small sources still work.
+    """
+    item = random.choice(words)
+    for _ in range(max_retries):
+        if word_key(item) not in seen:
+            break
+        item = random.choice(words)
+    return item
@@ -0,0 +1,487 @@
+# rtkr/server.py - Headless drill server
+#
+# Loads a word source once into shared in-memory indexes and serves the drill to any number
+# of local clients over HTTP/1.1 (keep-alive, JSON responses), using only asyncio.
+# The kanji of the current word stays on the server until the client asks to reveal it.
+#
+# Usage (from the parent directory of the rtkr package):
+#   python -m rtkr.server [--source NAME] [--host HOST] [--port PORT]
+#   python -m rtkr.server --bench 1,10,100 [--rounds N] [--source NAME]
+#
+# Endpoints (the session id is passed as the 'session' query parameter):
+#   POST /session          start a session -> {"session": ID}
+#   GET  /next             pick the next word -> {"reading": ...}
+#   GET  /reveal           -> {"reading": ..., "word": ..., "meta": {...}}
+#   POST /mark             add the current word to the revisions -> {"marked": bool, "count": N}
+#   GET  /revisions        -> {"revisions": [{"reading": ..., "word": ...}, ...]}
+#   GET  /audio            TTS audio (audio/mpeg) of the current word, from a cache
+#   GET  /search?q=PREFIX  -> {"results": [[reading, word], ...]}
+#   GET  /stats            word, session and cache counts
+
+import argparse
+import asyncio
+import io
+import json
+import os
+import secrets
+import shutil
+import tempfile
+import time
+from collections import OrderedDict
+from urllib.parse import urlsplit, parse_qsl
+
+# gTTS is optional for the server, /audio answers 503 without it
+try:
+    from gtts import gTTS
+except ImportError:
+    gTTS = None
+
+# Import configuration settings
+from .config import (
+    SERVER_HOST, SERVER_PORT, SERVER_MAX_SESSIONS, SERVER_AUDIO_CACHE_SIZE, SERVER_SAVE_DELAY,
+    REVISIONS_FILE, SERVER_SEEN_FILTER_FILE, SEARCH_MAX_RESULTS
+)
+from .revisions_io import revision_key, read_revisions_file, save_revisions_file
+from .search import PrefixIndex
+from .seen_filter import SeenFilter, word_key, sample_unseen
+from .sources import SourceError, available_sources, get_source, load_words
+from .utils import percentile
+
+MAX_HEADER_SIZE = 16 * 1024 # Bytes allowed for the request line and headers
+MAX_BODY_SIZE = 64 * 1024
+
+STATUS_REASONS = {
+    200: 'OK', 400: 'Bad Request', 404: 'Not Found', 405: 'Method Not Allowed',
+    413: 'Payload Too Large', 431: 'Request Header Fields Too Large', 500: 'Internal Server Error',
+    503: 'Service Unavailable'
+}
+
+class HTTPError(Exception):
+    """
+    Raised by a request handler to answer with an error status and a JSON {"error": message}.
+    """
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+
+class DrillServer:
+    """
+    Serves one loaded word source to many clients. Words, the search index, the seen words
+    filter, the revisions and the audio cache are shared; each session only keeps its current word.
+    Everything runs on the event loop thread, blocking work (loading, TTS, saving) goes to threads.
+    Revisions are shared with the app through REVISIONS_FILE: words marked here are merged into
+    the file as it is on disk when saving, so changes made by the app meanwhile are kept.
+    """
+
+    def __init__(self, source_name, revisions_file=REVISIONS_FILE, seen_file=SERVER_SEEN_FILTER_FILE):
+        self.source_name = source_name
+        self.revisions_file = revisions_file
+        self.words = []
+        self.search_index = None
+        self.seen = SeenFilter(seen_file)
+        self.revisions = []
+        self._revision_keys = set() # (reading, word) pairs of self.revisions
+        self._unsaved_revisions = [] # Marked since the last save, merged into the revisions file on save
+        self.sessions = OrderedDict() # session id -> current word entry (or None), least recently used first
+        self.audio_cache = OrderedDict() # spoken text -> mp3 bytes, least recently used first
+        self._audio_pending = {} # spoken text -> Future of a TTS generation in progress
+        self._save_handle = None
+        self.requests = 0
+        self.routes = {
+            ('POST', '/session'): self._new_session,
+            ('GET', '/next'): self._next,
+            ('GET', '/reveal'): self._reveal,
+            ('POST', '/mark'): self._mark,
+            ('GET', '/revisions'): self._get_revisions,
+            ('GET', '/audio'): self._audio,
+            ('GET', '/search'): self._search,
+            ('GET', '/stats'): self._stats,
+        }
+
+    # --- Loading and saving ---
+
+    async def load(self):
+        """
+        Loads the word source and the revisions, and builds the search index, in a worker thread.
+        """
+        loop = asyncio.get_running_loop()
+        source = get_source(self.source_name)
+        if source is None:
+            names = ', '.join(s.name for s in available_sources())
+            raise SourceError(f"Unknown word source {self.source_name} (available: {names})")
+        start = time.perf_counter()
+        self.words = await loop.run_in_executor(None, load_words, source, lambda: None)
+        if not self.words:
+            raise SourceError(f"No words loaded from {source.label}!")
+        self.search_index = await loop.run_in_executor(None, PrefixIndex.from_words, self.words)
+        self.revisions = await loop.run_in_executor(None, self._read_revisions)
+        self._revision_keys = {(entry.get('reading', ''), entry.get('word', '')) for entry in self.revisions}
+        print(f"Serving {len(self.words)} words from {source.label} "
+              f"(loaded in {time.perf_counter() - start:.2f}s, {len(self.revisions)} revisions).")
+
+    def _read_revisions(self):
+        try:
+            return read_revisions_file(self.revisions_file).get('revisions', [])
+        except Exception as e:
+            print(f"Error reading revisions {self.revisions_file}: {e}")
+            return []
+
+    def _write_files(self, new_revisions):
+        """
+        Adds the newly marked revisions to the revisions file, keeping the rest of the file
+        (the app's revisions and 'current_source') as it is on disk, and saves the seen words.
+        Returns the revisions now in the file, or None if the file couldn't be read or written.
+        Runs in a worker thread.
+        """
+        try:
+            revisions = save_revisions_file(self.revisions_file, new_revisions, ())
+        except Exception as e:
+            print(f"Error saving revisions to {self.revisions_file}: {e}")
+            revisions = None
+        self.seen.save()
+        return revisions
+
+    def _take_unsaved_revisions(self):
+        new_revisions, self._unsaved_revisions = self._unsaved_revisions, []
+        return new_revisions
+
+    def _saved(self, new_revisions, revisions):
+        """
+        Takes over the revisions of the file after a save. Runs on the event loop thread.
+        Unsaved revisions are kept for the next save if it failed.
+        """
+        if revisions is None:
+            self._unsaved_revisions[:0] = new_revisions
+            return
+        keys = {revision_key(entry) for entry in revisions}
+        # Words marked while the file was being written are still to be saved
+        self.revisions = revisions + [entry for entry in self._unsaved_revisions if revision_key(entry) not in keys]
+        self._revision_keys = {revision_key(entry) for entry in self.revisions}
+
+    def _schedule_save(self):
+        """
+        Saves the revisions and seen words SERVER_SAVE_DELAY seconds after the first unsaved
+        change, so a burst of requests causes a single write.
+        """
+        if self._save_handle is None:
+            loop = asyncio.get_running_loop()
+            self._save_handle = loop.call_later(SERVER_SAVE_DELAY, self._save_now)
+
+    def _save_now(self):
+        self._save_handle = None
+        new_revisions = self._take_unsaved_revisions()
+        future = asyncio.get_running_loop().run_in_executor(None, self._write_files, new_revisions)
+        future.add_done_callback(lambda done: self._saved(new_revisions, None if done.cancelled() else done.result()))
+
+    def save(self):
+        """
+        Saves pending changes right away (on shutdown).
+        """
+        if self._save_handle is not None:
+            self._save_handle.cancel()
+            self._save_handle = None
+        new_revisions = self._take_unsaved_revisions()
+        self._saved(new_revisions, self._write_files(new_revisions))
+
+    # --- Request handlers ---
+
+    def _session(self, query):
+        session_id = query.get('session')
+        if session_id not in self.sessions:
+            raise HTTPError(404, "Unknown session, POST /session to start one")
+        self.sessions.move_to_end(session_id)
+        return session_id
+
+    def _current(self, query):
+        current = self.sessions[self._session(query)]
+        if current is None:
+            raise HTTPError(400, "No current word, GET /next first")
+        return current
+
+    async def _new_session(self, query, body):
+        session_id = secrets.token_urlsafe(12)
+        self.sessions[session_id] = None
+        while len(self.sessions) > SERVER_MAX_SESSIONS:
+            self.sessions.popitem(last=False)
+        return {'session': session_id}
+
+    async def _next(self, query, body):
+        session_id = self._session(query)
+        item = sample_unseen(self.words, self.seen)
+        self.seen.add(word_key(item))
+        self._schedule_save()
+        self.sessions[session_id] = item
+        return {'reading': item['japanese'][0].get('reading', '')}
+
+    async def _reveal(self, query, body):
+        item = self._current(query)
+        jap_entry = item['japanese'][0]
+        return {'reading': jap_entry.get('reading', ''), 'word': jap_entry.get('word', ''), 'meta': item.get('meta', {})}
+
+    async def _mark(self, query, body):
+        jap_entry = self._current(query)['japanese'][0]
+        key = (jap_entry.get('reading', ''), jap_entry.get('word', ''))
+        marked = key not in self._revision_keys
+        if marked:
+            self._revision_keys.add(key)
+            entry = {'reading': key[0], 'word': key[1]}
+            self.revisions.append(entry)
+            self._unsaved_revisions.append(entry)
+            self._schedule_save()
+        return {'marked': marked, 'count': len(self.revisions)}
+
+    async def _get_revisions(self, query, body):
+        return {'revisions': self.revisions}
+
+    async def _search(self, query, body):
+        return {'results': self.search_index.search(query.get('q', ''), SEARCH_MAX_RESULTS)}
+
+    async def _stats(self, query, body):
+        return {
+            'source': self.source_name, 'words': len(self.words), 'sessions': len(self.sessions),
+            'revisions': len(self.revisions), 'audio_cached': len(self.audio_cache),
+            'seen_filter_bytes': self.seen.memory_size(), 'requests': self.requests
+        }
+
+    async def _audio(self, query, body):
+        if gTTS is None:
+            raise HTTPError(503, "gTTS is not installed")
+        jap_entry = self._current(query)['japanese'][0]
+        text = jap_entry.get('word', '') or jap_entry.get('reading', '') # Kanji first, like the app
+        audio = self.audio_cache.get(text)
+        if audio is not None:
+            self.audio_cache.move_to_end(text)
+            return audio
+
+        # Clients asking for the same word while it is generated share the generation. Each one
+        # waits through shield(), so a client going away doesn't cancel it for the others, and
+        # the result is cached by _audio_done whether or not anyone is still waiting.
+        pending = self._audio_pending.get(text)
+        if pending is None:
+            pending = asyncio.get_running_loop().run_in_executor(None, _synthesize, text)
+            self._audio_pending[text] = pending
+            pending.add_done_callback(lambda done: self._audio_done(text, done))
+        try:
+            return await asyncio.shield(pending)
+        except asyncio.CancelledError:
+            if pending.cancelled():
+                raise HTTPError(503, "TTS was cancelled")
+            raise # This request itself was cancelled
+        except Exception as e:
+            raise HTTPError(503, f"TTS failed: {e}")
+
+    def _audio_done(self, text, future):
+        """
+        Caches the audio of a finished TTS generation. Runs on the event loop thread.
+        """
+        if self._audio_pending.get(text) is future:
+            del self._audio_pending[text]
+        if future.cancelled() or future.exception() is not None:
+            return
+        self.audio_cache[text] = future.result()
+        while len(self.audio_cache) > SERVER_AUDIO_CACHE_SIZE:
+            self.audio_cache.popitem(last=False)
+
+    # --- HTTP ---
+
+    async def _dispatch(self, method, target, body):
+        """
+        Runs the handler for a request. Returns (status, content type, body bytes).
+        """
+        url = urlsplit(target)
+        handler = self.routes.get((method, url.path))
+        try:
+            if handler is None:
+                if any(path == url.path for _, path in self.routes):
+                    raise HTTPError(405, f"{method} not allowed on {url.path}")
+                raise HTTPError(404, f"No endpoint {url.path}")
+            result = await handler(dict(parse_qsl(url.query)), body)
+            if isinstance(result, bytes):
+                return 200, 'audio/mpeg', result
+            return 200, 'application/json', json.dumps(result, ensure_ascii=False).encode('utf-8')
+        except HTTPError as e:
+            status, message = e.status, str(e)
+        except Exception as e:
+            print(f"Error handling {method} {target}: {e}")
+            status, message = 500, str(e)
+        return status, 'application/json', json.dumps({'error': message}).encode('utf-8')
+
+    async def handle_connection(self, reader, writer):
+        """
+        Serves requests on one connection until the client closes it (keep-alive).
+        """
+        try:
+            while True:
+                try:
+                    head = await reader.readuntil(b'\r\n\r\n')
+                except asyncio.LimitOverrunError:
+                    await _send(writer, 431, 'application/json', b'{"error": "Headers too large"}', False)
+                    break
+                except (asyncio.IncompleteReadError, ConnectionError):
+                    break # Client closed the connection
+
+                lines = head.decode('latin-1').split('\r\n')
+                try:
+                    method, target, version = lines[0].split(' ', 2)
+                except ValueError:
+                    await _send(writer, 400, 'application/json', b'{"error": "Malformed request line"}', False)
+                    break
+                headers = {}
+                for line in lines[1:]:
+                    if ':' in line:
+                        name, value = line.split(':', 1)
+                        headers[name.strip().lower()] = value.strip()
+                try:
+                    length = int(headers.get('content-length') or 0)
+                except ValueError:
+                    length = -1
+                if length < 0 or length > MAX_BODY_SIZE:
+                    await _send(writer, 413, 'application/json', b'{"error": "Invalid body size"}', False)
+                    break
+                body = await reader.readexactly(length) if length else b''
+
+                self.requests += 1
+                status, content_type, payload = await self._dispatch(method, target, body)
+                keep_alive = version == 'HTTP/1.1' and headers.get('connection', '').lower() != 'close'
+                await _send(writer, status, content_type, payload, keep_alive)
+                if not keep_alive:
+                    break
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        except asyncio.CancelledError:
+            pass # Server shutting down with the connection still open
+        finally:
+            writer.close()
+
+    async def start(self, host=SERVER_HOST, port=SERVER_PORT):
+        """
+        Starts listening and returns the asyncio server.
+        """
+        return await asyncio.start_server(self.handle_connection, host, port, limit=MAX_HEADER_SIZE)
+
+async def _send(writer, status, content_type, payload, keep_alive):
+    head = (f"HTTP/1.1 {status} {STATUS_REASONS.get(status, '')}\r\n"
+            f"Content-Type: {content_type}\r\n"
+            f"Content-Length: {len(payload)}\r\n"
+            f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n")
+    writer.write(head.encode('latin-1') + payload)
+    await writer.drain()
+
+def _synthesize(text):
+    """
+    Generates the TTS audio of a text as mp3 bytes. Runs in a worker thread.
+    """
+    buffer = io.BytesIO()
+    gTTS(text=text, lang='ja').write_to_fp(buffer)
+    return buffer.getvalue()
+
+# --- Benchmark ---
+
+class _BenchClient:
+    """
+    Minimal keep-alive HTTP client for the benchmark.
+    """
+
+    async def connect(self, host, port):
+        self.reader, self.writer = await asyncio.open_connection(host, port)
+
+    async def request(self, method, path):
+        self.writer.write(f"{method} {path} HTTP/1.1\r\nHost: localhost\r\nContent-Length: 0\r\n\r\n".encode('latin-1'))
+        await self.writer.drain()
+        head = await self.reader.readuntil(b'\r\n\r\n')
+        lines = head.decode('latin-1').split('\r\n')
+        status = int(lines[0].split(' ', 2)[1])
+        length = next(int(line.split(':', 1)[1]) for line in lines[1:] if line.lower().startswith('content-length:'))
+        body = await self.reader.readexactly(length)
+        if status != 200:
+            raise RuntimeError(f"{method} {path} failed with {status}: {body[:200]!r}")
+        return json.loads(body)
+
+    def close(self):
+        self.writer.close()
+
+async def _bench_client(host, port, rounds, latencies):
+    """
+    Drills 'rounds' words (next, reveal, and a mark every tenth word) and records request latencies.
+    """
+    client = _BenchClient()
+    await client.connect(host, port)
+    try:
+        session = (await client.request('POST', '/session'))['session']
+        for i in range(rounds):
+            requests = [('GET', '/next'), ('GET', '/reveal')]
+            if i % 10 == 9:
+                requests.append(('POST', '/mark'))
+            for method, path in requests:
+                start = time.perf_counter()
+                await client.request(method, f"{path}?session={session}")
+                latencies.setdefault(path, []).append(time.perf_counter() - start)
+    finally:
+        client.close()
+
+async def _run_benchmark(source_name, client_counts, rounds):
+    """
+    Loads the source once, then runs the given numbers of concurrent clients against the server
+    (in the same process and event loop) and prints throughput and latency percentiles.
+    Revisions and seen words go to a temporary directory.
+    """
+    temp_dir = tempfile.mkdtemp(prefix='rtkr-server-bench-')
+    try:
+        server = DrillServer(source_name, os.path.join(temp_dir, 'revisions.json'), os.path.join(temp_dir, 'seen_words.bin'))
+        await server.load()
+        listener = await server.start('127.0.0.1', 0)
+        host, port = listener.sockets[0].getsockname()[:2]
+        try:
+            for clients in client_counts:
+                latencies = {}
+                start = time.perf_counter()
+                await asyncio.gather(*(_bench_client(host, port, rounds, latencies) for _ in range(clients)))
+                elapsed = time.perf_counter() - start
+                total = sum(len(values) for values in latencies.values())
+                print(f"{clients} clients x {rounds} words: {total} requests in {elapsed:.2f}s "
+                      f"({total / elapsed:.0f} req/s)")
+                for path, values in latencies.items():
+                    print(f"  {path:8} p50 {percentile(values, 50) * 1000:.2f} ms, p95 {percentile(values, 95) * 1000:.2f} ms, "
+                          f"p99 {percentile(values, 99) * 1000:.2f} ms (n={len(values)})")
+        finally:
+            listener.close()
+            await listener.wait_closed()
+            server.save()
+    finally:
+        shutil.rmtree(temp_dir, ignore_errors=True)
+
+# --- Entry point ---
+
+async def _serve(source_name, host, port):
+    server = DrillServer(source_name)
+    await server.load()
+    listener = await server.start(host, port)
+    print(f"Drill server listening on http://{host}:{port}")
+    try:
+        async with listener:
+            await listener.serve_forever()
+    finally:
+        server.save()
+
+def run(argv=None):
+    parser = argparse.ArgumentParser(description="Serve the drill to local clients over HTTP.")
+    parser.add_argument('--source', default='JLPT5', help="Word source to serve (default: JLPT5)")
+    parser.add_argument('--host', default=SERVER_HOST)
+    parser.add_argument('--port', type=int, default=SERVER_PORT)
+    parser.add_argument('--bench', metavar='CLIENTS', help="Benchmark with these numbers of concurrent clients, e.g. 1,10,100")
+    parser.add_argument('--rounds', type=int, default=50, help="Words drilled per benchmark client (default: 50)")
+    args = parser.parse_args(argv)
+
+    try:
+        if args.bench:
+            client_counts = [int(count) for count in args.bench.split(',')]
+            asyncio.run(_run_benchmark(args.source, client_counts, args.rounds))
+        else:
+            asyncio.run(_serve(args.source, args.host, args.port))
+    except SourceError as e:
+        print(e)
+    except KeyboardInterrupt:
+        pass
+
+if __name__ == '__main__':
+    run()
@@ -0,0 +1,350 @@
+# rtkr/sources.py
+
+import abc
+import csv
+import os
+import random
+import threading
+
+# Import configuration settings
+from .config import (
+    JMDICT_COMMON_FILE, JLPT_LEVELS, REMOTE_JSON_URLS, LOCAL_JLPT_FILES,
+    PREFETCH_ALL_JLPT_LEVELS, LOAD_CANCEL_CHECK_INTERVAL, USER_SOURCES
+)
+from .utils import (
+    download_file_content, download_jlpt_lists, is_primarily_katakana,
+    find_jmdict_file, detect_compression
+)
+from .jmdict_store import JMdictStore
+from .revisions_io import iter_import_rows
+
+# Entry point group third-party packages can use to add word sources
+ENTRY_POINT_GROUP = 'rtkr.sources'
+
+class SourceError(Exception):
+    """
+    Raised by a word source that can't provide its words. The message is shown to the user.
+    """
+
+class WordSource(abc.ABC):
+    """
+    Base class of the word source plugin protocol.
+
+    A source has a unique 'name' (saved as the current source preference), a 'label'
+    shown on its button in the source panel, and yields its words as
+    (reading, kanji, metadata) records from iter_records(). Sources with a 'sample_size'
+    are not fully loaded: a uniform random sample of that many records is kept instead.
+    """
+    name = ''
+    label = ''
+    sample_size = None # Maximum number of words kept in memory (None keeps all of them)
+
+    # Sources that can report changes since the last load also define 'key_field'
+    # (the metadata field identifying a record), update(check), returning an object
+    # with 'added', 'changed' and 'removed' dicts of key -> (reading, kanji), and
+    # commit_update(diff), called once the changes have been applied. See JMdictSource.
+    key_field = None
+
+    @abc.abstractmethod
+    def iter_records(self, check):
+        """
+        Yields (reading, kanji, metadata) tuples. 'check' should be called regularly on long
+        sources; it raises an exception when the load has been cancelled.
+        Raises SourceError if the words can't be loaded.
+        """
+
+class JMdictSource(WordSource):
+    """
+    The full JMdict dictionary, read from the (possibly compressed) JMdict_e XML file.
+    Parsed entries are persisted in a JMdictStore keyed by <ent_seq>, so an unchanged file
+    isn't parsed again and an updated file only has its added and changed entries parsed.
+    """
+    name = 'JMdict'
+    label = 'JMdict'
+    key_field = 'ent_seq' # Metadata field identifying an entry across updates
+
+    def __init__(self):
+        self.store = JMdictStore()
+
+    def _find_file(self):
+        # Find the JMdict file (plain or compressed) in the resources directory
+        jmdict_path = find_jmdict_file(os.path.dirname(__file__))
+        if not jmdict_path:
+            print(f"Error: {JMDICT_COMMON_FILE} not found (also tried compressed variants).")
+            raise SourceError(f"Error: {JMDICT_COMMON_FILE} not found!")
+        file_size_mb = os.path.getsize(jmdict_path) / (1024 * 1024)
+        compression = detect_compression(jmdict_path) or 'uncompressed'
+        print(f"Loading words from {jmdict_path} (Size: {file_size_mb:.2f} MB, {compression})...")
+        return jmdict_path
+
+    def iter_records(self, check):
+        # A full load replaces every word, so the changes can be stored right away
+        self.store.commit(self.store.sync(self._find_file(), check))
+        for seq, reading, kanji in self.store.iter_entries():
+            yield reading, kanji, {'ent_seq': seq}
+
+    def update(self, check):
+        """
+        Compares the JMdict file with the store and returns the JMdictDiff against the
+        previous version. The store keeps the previous version until commit_update(diff),
+        so a diff that is never applied is found again by the next update.
+        """
+        return self.store.sync(self._find_file(), check)
+
+    def commit_update(self, diff):
+        """
+        Stores the changes of a diff returned by update(), once they have been applied.
+        """
+        self.store.commit(diff)
+
+class JLPTSource(WordSource):
+    """
+    The word list of a JLPT level, downloaded from GitHub with the bundled CSV as fallback.
+    Downloaded lists are cached for the session, and the other levels are prefetched
+    in the background once one list has been downloaded.
+    """
+    _cache = {} # level -> CSV content, shared by all levels
+    _prefetch_started = False
+    _prefetch_lock = threading.Lock()
+
+    def __init__(self, level):
+        self.level = level
+        self.name = f'JLPT{level}'
+        self.label = f'JLPT N{level}'
+
+    def iter_records(self, check):
+        print(f"Loading from JLPT N{self.level} (GitHub CSV API)...")
+        csv_url = REMOTE_JSON_URLS.get(self.level) # Get the URL for the specific level
+        if not csv_url:
+            print(f"No URL found for JLPT N{self.level}.")
+            raise SourceError(f"No URL for JLPT N{self.level}!")
+
+        # Use the list prefetched in the background if we have it, otherwise download it now
+        csv_content = JLPTSource._cache.get(self.level) or download_file_content(csv_url)
+        if csv_content:
+            JLPTSource._cache[self.level] = csv_content
+            if PREFETCH_ALL_JLPT_LEVELS:
+                JLPTSource._start_prefetch()
+        else:
+            csv_content = self._read_local_file()
+        check() # The download may have taken a while
+
+        if not csv_content:
+            print(f"No content or malformed response from CSV API for JLPT N{self.level}.")
+            raise SourceError(f"No words loaded from JLPT N{self.level}!")
+
+        # Columns are expression (kanji), reading, meaning, tags. Skip the header (first line).
+        rows = csv.reader(csv_content.strip().split('\n'))
+        next(rows, None)
+        for parts in rows:
+            if len(parts) >= 2: # Ensure we have at least 'expression' and 'reading'
+                metadata = {}
+                if len(parts) >= 3:
+                    metadata['meaning'] = parts[2].strip()
+                yield parts[1].strip(), parts[0].strip(), metadata
+
+    def _read_local_file(self):
+        """
+        Returns the bundled CSV for this level (fallback when the download fails), or None.
+        """
+        path = os.path.join(os.path.dirname(__file__), LOCAL_JLPT_FILES.get(self.level, ''))
+        if not os.path.isfile(path):
+            return None
+        print(f"Using local file {path} for JLPT N{self.level}.")
+        with open(path, 'r', encoding='utf-8') as f:
+            return f.read()
+
+    @classmethod
+    def _start_prefetch(cls):
+        """
+        Starts downloading all JLPT lists not cached yet in a background thread (once per session),
+        so switching to another level doesn't wait for the network.
+        """
+        with cls._prefetch_lock:
+            if cls._prefetch_started:
+                return
+            cls._prefetch_started = True
+        missing = [level for level in JLPT_LEVELS if level not in cls._cache]
+        if not missing:
+            return
+
+        def prefetch():
+            for level, content in download_jlpt_lists(missing).items():
+                if content:
+                    cls._cache.setdefault(level, content)
+
+        threading.Thread(target=prefetch, daemon=True).start()
+
+class FileSource(WordSource):
+    """
+    A user-supplied word list (book glossary, frequency list, ...) in a CSV, TSV or
+    Anki text file, read with the same column detection as the revision import.
+    """
+
+    def __init__(self, name, path, label=None, sample_size=None):
+        self.name = name
+        self.label = label or name
+        self.path = path
+        self.sample_size = sample_size
+
+    def iter_records(self, check):
+        if not os.path.isfile(self.path):
+            print(f"Error: word list {self.path} not found.")
+            raise SourceError(f"Error: {os.path.basename(self.path)} not found!")
+        print(f"Loading words from {self.path}...")
+        for count, (reading, word) in enumerate(iter_import_rows(self.path)):
+            if count % LOAD_CANCEL_CHECK_INTERVAL == 0:
+                check()
+            yield reading, word, {}
+
+# --- Registry ---
+
+_sources = {} # name -> WordSource, in registration order
+_registry_lock = threading.Lock()
+_registry_loaded = False
+_registry_errors = [] # Problems found while loading the registry, not reported to the user yet
+
+def register_source(source):
+    """
+    Adds a word source to the registry, replacing any source with the same name.
+    """
+    with _registry_lock:
+        _sources[source.name] = source
+
+def _load_registry():
+    """
+    Registers the built-in sources, the sources from USER_SOURCES in the config and
+    the sources provided by installed packages through the 'rtkr.sources' entry point group.
+    Each entry point must load to a WordSource, or to a callable returning one or a list of them.
+    """
+    global _registry_loaded
+    if _registry_loaded:
+        return
+    _registry_loaded = True
+
+    register_source(JMdictSource())
+    for level in JLPT_LEVELS:
+        register_source(JLPTSource(level))
+
+    for index, options in enumerate(USER_SOURCES):
+        problem = _check_user_source(options)
+        if problem:
+            _report_registry_error(f"Skipping USER_SOURCES entry {index + 1}: {problem}.")
+            continue
+        path = options['path']
+        if not os.path.isabs(path):
+            path = os.path.join(os.path.dirname(__file__), path)
+        register_source(FileSource(options['name'], path, options.get('label'), options.get('sample_size')))
+
+    try:
+        from importlib.metadata import entry_points
+        try:
+            plugins = entry_points(group=ENTRY_POINT_GROUP)
+        except TypeError: # Python < 3.10
+            plugins = entry_points().get(ENTRY_POINT_GROUP, [])
+    except ImportError:
+        plugins = []
+    for entry_point in plugins:
+        try:
+            provided = entry_point.load()
+            if callable(provided) and not isinstance(provided, WordSource):
+                provided = provided()
+            for source in (provided if isinstance(provided, (list, tuple)) else [provided]):
+                register_source(source)
+        except Exception as e:
+            _report_registry_error(f"Error loading word source plugin {entry_point.name}: {e}")
+
+def _check_user_source(options):
+    """
+    Returns what is wrong with a USER_SOURCES entry, or None if it can be used.
+    """
+    if not isinstance(options, dict):
+        return "expected a dict with 'name' and 'path'"
+    for key in ('name', 'path'):
+        if not isinstance(options.get(key), str) or not options[key]:
+            return f"'{key}' must be a non-empty string"
+    if options.get('label') is not None and not isinstance(options['label'], str):
+        return "'label' must be a string"
+    sample_size = options.get('sample_size')
+    if sample_size is not None and (not isinstance(sample_size, int) or sample_size <= 0):
+        return "'sample_size' must be a positive integer"
+    return None
+
+def _report_registry_error(message):
+    print(message)
+    with _registry_lock:
+        _registry_errors.append(message)
+
+def take_registry_errors():
+    """
+    Returns the problems found while loading the registry (skipped USER_SOURCES entries,
+    failed plugins) that haven't been returned before, so each is shown to the user once.
+    """
+    _load_registry()
+    with _registry_lock:
+        errors = list(_registry_errors)
+        _registry_errors.clear()
+        return errors
+
+def available_sources():
+    """
+    Returns all registered word sources, built-in sources first.
+    """
+    _load_registry()
+    with _registry_lock:
+        return list(_sources.values())
+
+def get_source(name):
+    """
+    Returns the registered word source with the given name, or None.
+    """
+    _load_registry()
+    with _registry_lock:
+        return _sources.get(name)
+
+# --- Loading ---
+
+def make_word_item(reading, kanji, metadata=None):
+    """
+    Returns a record in the word entry format used by the app,
+    {'japanese': [{'reading': ..., 'word': ...}], 'meta': {...}},
+    or None for words that are skipped: no kanji and a primarily Katakana reading.
+    """
+    reading = reading or ''
+    kanji = kanji or ''
+    # Skip if no kanji and the reading is primarily katakana
+    if not kanji and is_primarily_katakana(reading):
+        return None
+    # Only add if we have at least a reading or a kanji (after filtering)
+    if not kanji and not reading:
+        return None
+    item = {'japanese': [{'reading': reading, 'word': kanji}]}
+    if metadata:
+        item['meta'] = metadata
+    return item
+
+def load_words(source, check):
+    """
+    Reads a source into a list of word entries (see make_word_item).
+    If the source has a sample_size, only a uniform random sample of that many words
+    is kept (reservoir sampling), so memory doesn't grow with the size of the source.
+    """
+    words = []
+    sample_size = source.sample_size
+    seen = 0
+    for reading, kanji, metadata in source.iter_records(check):
+        item = make_word_item(reading, kanji, metadata)
+        if item is None:
+            continue
+
+        seen += 1
+        if sample_size is None or len(words) < sample_size:
+            words.append(item)
+        else:
+            # Keep the new word with probability sample_size / seen
+            slot = random.randrange(seen)
+            if slot < sample_size:
+                words[slot] = item
+
+    print(f"Loaded {len(words)} words from {source.label}" + (f" (sampled from {seen})." if len(words) < seen else "."))
+    return words
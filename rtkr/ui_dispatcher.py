@@ -0,0 +1,114 @@
+# rtkr/ui_dispatcher.py
+
+import threading
+import time
+
+from kivy.clock import Clock
+
+from .config import UI_STATS_INTERVAL, UI_BATCH_UPDATES
+
+class UIDispatcher:
+    """
+    Collects UI state changes requested from any thread and applies them in one batch,
+    at most once per frame, on the Kivy main thread.
+
+    Attribute changes are coalesced: if the same attribute of the same widget is set
+    several times before the next frame, only the latest value is applied.
+    Queued calls run after the attribute changes, in the order they were queued,
+    and identical calls queued in the same frame only run once.
+
+    With batched=False every change and call is scheduled as its own Clock callback, like the
+    per-update Clock.schedule_once lambdas and @mainthread calls this class replaced. That mode
+    only exists to measure the difference (see UI_BATCH_UPDATES).
+    """
+
+    def __init__(self, batched=UI_BATCH_UPDATES):
+        self.batched = batched
+        self._lock = threading.Lock()
+        self._pending_attrs = {} # (widget, attribute name) -> latest value
+        self._pending_calls = [] # (function, args) in queuing order
+        # A trigger only fires once per frame however many times it is called
+        self._trigger = Clock.create_trigger(self._flush, 0)
+
+        # Counters used to measure how often the UI thread is woken up by the app
+        self.wakeups = 0 # Number of batches applied (callbacks run, when not batched)
+        self.updates = 0 # Number of attribute changes and calls applied
+        self.total_wakeups = 0 # Same counts since creation, for reports like the replay harness
+        self.total_updates = 0
+        self.created = time.monotonic()
+        self._stats_started = self.created
+        if UI_STATS_INTERVAL > 0:
+            Clock.schedule_interval(self._log_stats, UI_STATS_INTERVAL)
+
+    def set(self, widget, **values):
+        """
+        Queues attribute changes for a widget, e.g. set(label, text='...', opacity=1).
+        Can be called from any thread.
+        """
+        if not self.batched:
+            for name, value in values.items():
+                Clock.schedule_once(lambda dt, name=name, value=value: self._run_direct(setattr, (widget, name, value)), 0)
+            return
+        with self._lock:
+            for name, value in values.items():
+                self._pending_attrs[(widget, name)] = value
+        self._trigger()
+
+    def call(self, func, *args):
+        """
+        Queues a function call to be run on the main thread with the next batch.
+        Can be called from any thread.
+        """
+        if not self.batched:
+            Clock.schedule_once(lambda dt: self._run_direct(func, args), 0)
+            return
+        with self._lock:
+            if (func, args) not in self._pending_calls:
+                self._pending_calls.append((func, args))
+        self._trigger()
+
+    def _flush(self, dt):
+        """
+        Applies all pending attribute changes and calls. Runs on the main thread.
+        """
+        with self._lock:
+            attrs, self._pending_attrs = self._pending_attrs, {}
+            calls, self._pending_calls = self._pending_calls, []
+        if not attrs and not calls:
+            return
+
+        self.count_wakeup(len(attrs) + len(calls))
+        for (widget, name), value in attrs.items():
+            # Skip no-op assignments so Kivy doesn't dispatch property events for them
+            if getattr(widget, name) != value:
+                setattr(widget, name, value)
+        for func, args in calls:
+            func(*args)
+
+    def _run_direct(self, func, args):
+        """
+        Runs one unbatched change or call. Runs on the main thread.
+        """
+        self.count_wakeup(1)
+        func(*args)
+
+    def count_wakeup(self, updates=1):
+        """
+        Records a main thread wakeup caused by the app, e.g. a polling callback.
+        """
+        self.wakeups += 1
+        self.updates += updates
+        self.total_wakeups += 1
+        self.total_updates += updates
+
+    def _log_stats(self, dt):
+        """
+        Prints the wakeup and update rates since the last report.
+        """
+        now = time.monotonic()
+        elapsed = now - self._stats_started
+        if elapsed > 0:
+            print(f"UIDispatcher: {self.wakeups / elapsed:.2f} wakeups/s, {self.updates / elapsed:.2f} updates/s")
+        self.wakeups = 0
+        self.updates = 0
+        self._stats_started = now
@@ -1,38 +1,67 @@
 # rtkr/utils.py
 
-import urllib.request
 import re
+import math
 import os
 import json
+import time
+import gzip
+import lzma
+import codecs
+import queue
+import threading
+
+# zstandard is optional, only needed to read .zst compressed files
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
 
 # Import configuration settings
-from .config import FONT_URL, FONT_FILE, REVISIONS_FILE
+from .config import (
+    FONT_URL, FONT_FILE, REVISIONS_FILE, JLPT_LEVELS, REMOTE_JSON_URLS,
+    JMDICT_COMMON_FILE, JMDICT_COMPRESSED_FILES,
+    STREAM_CHUNK_SIZE, STREAM_QUEUE_DEPTH
+)
+from .fetcher import get_fetcher, FetchError
+
+# Magic bytes identifying the supported compression formats
+GZIP_MAGIC = b'\x1f\x8b'
+XZ_MAGIC = b'\xfd7zXZ\x00'
+ZSTD_MAGIC = b'\x28\xb5\x2f\xfd'
 
 def download_file_content(url):
     """
     Helper function to download file content from a given URL and return it as a string.
+    Uses the shared pooled fetcher, which retries temporary failures.
     """
     try:
         print(f"Fetching data from {url}...")
-        # Set a timeout for the request to prevent indefinite hanging
-        with urllib.request.urlopen(url, timeout=10) as response:
-            if response.getcode() == 200:
-                content = response.read().decode('utf-8')
-                print(f"Successfully fetched data from {url}.")
-                return content
-            else:
-                print(f"Error fetching data from {url}: HTTP Error {response.getcode()}: {response.reason}")
-                return None
-    except urllib.error.HTTPError as e:
-        print(f"Error downloading from {url}: HTTP Error {e.code}: {e.reason}")
+        content = get_fetcher().fetch_text(url)
+        print(f"Successfully fetched data from {url}.")
+        return content
+    except FetchError as e:
+        print(f"Error downloading from {url}: HTTP Error {e.status}: {e.reason}")
         return None
-    except urllib.error.URLError as e:
-        print(f"URL Error for {url}: {e.reason}. Check internet connection or URL validity.")
+    except OSError as e:
+        print(f"URL Error for {url}: {e}. Check internet connection or URL validity.")
         return None
     except Exception as e:
         print(f"Error fetching or parsing content from {url}: {e}")
         return None
 
+def download_jlpt_lists(levels=JLPT_LEVELS):
+    """
+    Downloads the CSV word lists of several JLPT levels concurrently.
+    Returns a dict of level -> CSV content (None for levels that failed).
+    """
+    urls = {level: REMOTE_JSON_URLS[level] for level in levels if level in REMOTE_JSON_URLS}
+    print(f"Fetching JLPT lists for levels {list(urls)} concurrently...")
+    start = time.perf_counter()
+    contents = get_fetcher().fetch_many(list(urls.values()))
+    print(f"Fetched {sum(1 for c in contents.values() if c)}/{len(urls)} JLPT lists in {time.perf_counter() - start:.2f}s.")
+    return {level: contents.get(url) for level, url in urls.items()}
+
 def is_primarily_katakana(text):
     """
     Checks if a string is primarily Katakana (contains Katakana and no Hiragana/Kanji).
@@ -70,7 +99,205 @@ def ensure_font_downloaded():
     if not os.path.exists(FONT_FILE):
         try:
             print(f"Downloading font from {FONT_URL} to {FONT_FILE}...")
-            urllib.request.urlretrieve(FONT_URL, FONT_FILE)
+            # Streamed straight to disk, FONT_FILE only appears once the download is complete
+            get_fetcher().download_to_file(FONT_URL, FONT_FILE)
             print("Font downloaded successfully.")
         except Exception as e:
             print(f"Error downloading font: {e}")
+
+def find_jmdict_file(base_dir):
+    """
+    Returns the path of the first JMdict file found in base_dir, trying the
+    uncompressed file first and then the compressed variants. Returns None if none exist.
+    """
+    for relative_path in [JMDICT_COMMON_FILE] + JMDICT_COMPRESSED_FILES:
+        path = os.path.join(base_dir, relative_path)
+        if os.path.exists(path):
+            return path
+    return None
+
+def detect_compression(path):
+    """
+    Detects the compression format of a file from its magic bytes.
+    Returns 'gzip', 'xz', 'zstd' or None for uncompressed files.
+    """
+    with open(path, 'rb') as f:
+        head = f.read(len(XZ_MAGIC))
+    if head.startswith(GZIP_MAGIC):
+        return 'gzip'
+    if head.startswith(XZ_MAGIC):
+        return 'xz'
+    if head.startswith(ZSTD_MAGIC):
+        return 'zstd'
+    return None
+
+def open_binary_stream(path):
+    """
+    Opens a file for binary reading, transparently decompressing gzip, xz or zstd input.
+    """
+    compression = detect_compression(path)
+    if compression == 'gzip':
+        return gzip.open(path, 'rb')
+    if compression == 'xz':
+        return lzma.open(path, 'rb')
+    if compression == 'zstd':
+        if zstandard is None:
+            raise IOError(f"{path} is zstd compressed, but the 'zstandard' package is not installed.")
+        return zstandard.ZstdDecompressor().stream_reader(open(path, 'rb'), closefd=True)
+    return open(path, 'rb')
+
+def iter_text_chunks(path, encoding='utf-8', chunk_size=STREAM_CHUNK_SIZE):
+    """
+    Yields decoded text chunks of a (possibly compressed) file.
+    Reading and decompression happen in a separate reader thread, so they overlap
+    with whatever the caller does with each chunk. Errors in the reader thread are
+    re-raised in the caller.
+    """
+    chunks = queue.Queue(maxsize=STREAM_QUEUE_DEPTH)
+    stop = threading.Event() # Set when the consumer stops early
+    done = object() # Sentinel marking the end of the stream
+
+    def put(item):
+        # Block while the queue is full, but give up if the consumer went away
+        while not stop.is_set():
+            try:
+                chunks.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def reader():
+        try:
+            # Incremental decoder so multi-byte characters split across chunks decode correctly
+            decoder = codecs.getincrementaldecoder(encoding)()
+            with open_binary_stream(path) as stream:
+                while not stop.is_set():
+                    data = stream.read(chunk_size)
+                    if not data:
+                        break
+                    text = decoder.decode(data)
+                    if text and not put(text):
+                        return
+                tail = decoder.decode(b'', final=True)
+                if tail:
+                    put(tail)
+            put(done)
+        except Exception as e:
+            put(e)
+
+    thread = threading.Thread(target=reader, daemon=True)
+    thread.start()
+    try:
+        while True:
+            item = chunks.get()
+            if item is done:
+                break
+            if isinstance(item, Exception):
+                raise item
+            yield item
+    finally:
+        stop.set() # Release the reader thread if we stopped early
+
+def iter_split_records(chunks, separator):
+    """
+    Splits a stream of text chunks on a separator and yields the complete records.
+    Anything before the first separator (the preamble) is skipped, like
+    content.split(separator)[1:] would do on the full text.
+    """
+    pending = ''
+    seen_separator = False
+    for chunk in chunks:
+        pending += chunk
+        parts = pending.split(separator)
+        pending = parts.pop() # The last part may be incomplete, keep it for the next chunk
+        if parts:
+            if not seen_separator:
+                parts = parts[1:] # Drop the preamble
+                seen_separator = True
+            yield from parts
+    if seen_separator:
+        yield pending
+
+def percentile(values, pct):
+    """
+    Returns the pct-th percentile of values (nearest-rank method), or None if empty.
+    """
+    if not values:
+        return None
+    ordered = sorted(values)
+    rank = max(1, math.ceil(pct / 100.0 * len(ordered)))
+    return ordered[min(rank, len(ordered)) - 1]
+
+def _run_benchmark(entries=200000, repeats=3):
+    """
+    Times a JMdict load (streaming, splitting into entries and parsing them) from an uncompressed
+    file and from gzip, xz and zstd (if installed) copies, against the old path of reading the whole
+    uncompressed file and splitting it at once. Uses a generated JMdict-like file of 'entries' entries
+    and reports the best of 'repeats' runs (the files are in the page cache after the first run).
+    """
+    import random
+    import shutil
+    import tempfile
+    from contextlib import closing
+    from .jmdict_store import parse_entry
+
+    temp_dir = tempfile.mkdtemp(prefix='rtkr-stream-bench-')
+    try:
+        # Varied glosses so the compression ratio is closer to the real file's
+        rng = random.Random(0)
+        vocabulary = [''.join(rng.choice('abcdefghijklmnopqrstuvwxyz') for _ in range(rng.randint(2, 9))) for _ in range(5000)]
+        raw_path = os.path.join(temp_dir, 'JMdict_e')
+        with open(raw_path, 'w', encoding='utf-8') as f:
+            f.write('<?xml version="1.0" encoding="UTF-8"?>\n<JMdict>\n')
+            for seq in range(entries):
+                f.write(f'<entry>\n<ent_seq>{1000000 + seq}</ent_seq>\n<k_ele>\n<keb>漢字{seq}</keb>\n</k_ele>\n'
+                        f'<r_ele>\n<reb>かんじ{seq}</reb>\n</r_ele>\n<sense>\n<pos>&n;</pos>\n'
+                        f'<gloss>{" ".join(rng.sample(vocabulary, 4))}</gloss>\n<gloss>{" ".join(rng.sample(vocabulary, 3))}</gloss>\n'
+                        f'</sense>\n</entry>\n')
+            f.write('</JMdict>\n')
+        with open(raw_path, 'rb') as f:
+            data = f.read()
+        variants = [('uncompressed', raw_path)]
+        with gzip.open(raw_path + '.gz', 'wb', compresslevel=6) as f:
+            f.write(data)
+        variants.append(('gzip', raw_path + '.gz'))
+        with lzma.open(raw_path + '.xz', 'wb', preset=6) as f:
+            f.write(data)
+        variants.append(('xz', raw_path + '.xz'))
+        if zstandard is not None:
+            with open(raw_path + '.zst', 'wb') as f:
+                f.write(zstandard.ZstdCompressor(level=3).compress(data))
+            variants.append(('zstd', raw_path + '.zst'))
+        del data
+
+        def best_time(load):
+            times = []
+            for _ in range(repeats):
+                start = time.perf_counter()
+                count = load()
+                times.append(time.perf_counter() - start)
+            return min(times), count
+
+        def load_whole():
+            with open(raw_path, 'r', encoding='utf-8') as f:
+                return sum(1 for entry in f.read().split('<entry>')[1:] if parse_entry(entry))
+
+        def load_streamed(path):
+            with closing(iter_text_chunks(path)) as chunks:
+                return sum(1 for entry in iter_split_records(chunks, '<entry>') if parse_entry(entry))
+
+        baseline, count = best_time(load_whole)
+        print(f"{entries} entries, {os.path.getsize(raw_path) / (1024 * 1024):.1f} MB uncompressed")
+        print(f"  read whole file + split (old path): {baseline:.2f}s ({count} entries)")
+
+        for name, path in variants:
+            elapsed, count = best_time(lambda: load_streamed(path))
+            print(f"  streamed {name:12} {elapsed:.2f}s ({count} entries, {os.path.getsize(path) / (1024 * 1024):.1f} MB on disk, "
+                  f"{elapsed / baseline:.2f}x the old path)")
+    finally:
+        shutil.rmtree(temp_dir, ignore_errors=True)
+
+if __name__ == '__main__':
+    # Run with: python -m rtkr.utils
+    _run_benchmark()